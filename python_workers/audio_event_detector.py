@@ -12,10 +12,16 @@ Input (JSON via stdin):
     "hop_size_ms": 250,
     "confidence_threshold": 0.7,
     "min_segment_duration_ms": 500,
-    "merge_gap_ms": 300
+    "merge_gap_ms": 300,
+    "silence_threshold_db": -80.0
   }
 }
 
+Run with --serve to keep the worker alive and process one such JSON job
+per stdin line, reusing the loaded model between jobs. With --serve
+--procs=N all jobs are read up to EOF and processed by N CPU-pinned worker
+processes, largest input first; each job's output is written in one piece.
+
 Output (JSON via stdout):
 {
   "type": "result",
@@ -38,26 +44,260 @@ Progress updates (JSON lines to stdout during processing):
 import json
 import sys
 import os
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional, TYPE_CHECKING
+from typing import Dict, Any, Iterable, Iterator, List, Tuple, Optional, TYPE_CHECKING
 import numpy as np
 
 if TYPE_CHECKING:
     import onnxruntime as ort
+    import torch
 
 # Add parent directories for imports
 sys.path.insert(0, str(Path(__file__).parent))
-from common.worker_base import WorkerBase
+from common.worker_base import WorkerBase, serve_pool
 from common.json_io import write_progress, write_error, write_log
 from common.audio_types import (
-    ModelConfig, AudioDetectionResult, TimestampSegment, SAMPLE_RATE
+    ModelConfig, AudioDetectionResult, TimestampSegment, SAMPLE_RATE, N_MELS, N_FFT, HOP_LENGTH
 )
 
 
+def _mel_power(
+    signal: np.ndarray,
+    mel_basis: np.ndarray,
+    window: np.ndarray,
+    hop_length: int,
+    block_frames: int = 2048
+) -> np.ndarray:
+    """
+    Mel power spectrogram of every full `len(window)` frame of `signal`.
+
+    Frames are taken as a strided view of the signal and transformed in
+    blocks of `block_frames` with a real FFT, so the windowed frame copy
+    never exceeds one block. The caller is responsible for any padding.
+
+    Returns:
+        (n_mels, frames) float32 array
+    """
+    from scipy import fft as sp_fft
+
+    n_fft = len(window)
+    frames = np.lib.stride_tricks.sliding_window_view(signal, n_fft)[::hop_length]
+
+    mel_spec = np.empty((mel_basis.shape[0], len(frames)), dtype=np.float32)
+    for start in range(0, len(frames), block_frames):
+        spectrum = sp_fft.rfft(frames[start:start + block_frames] * window, axis=-1, workers=-1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        mel_spec[:, start:start + len(power)] = mel_basis @ power.T
+    return mel_spec
+
+
+def _power_to_db(
+    mel_spec: np.ndarray,
+    top_db: float = 80.0,
+    scale: float = 1.0,
+    block_frames: int = 2048
+) -> np.ndarray:
+    """
+    In-place equivalent of librosa's `power_to_db(S * scale, ref=np.max)`
+    with default amin=1e-10 and top_db clipping.
+
+    The reference and clip floor only depend on the peak, so after one pass
+    to find it the conversion runs over column tiles of `block_frames`, with
+    every elementwise step applied while the tile is still in cache.
+    """
+    # Rounding is monotonic, so this is the max of the scaled array
+    peak = mel_spec.max(initial=0.0) * np.float32(scale)
+    ref_db = 10.0 * np.log10(max(float(peak), 1e-10))
+    peak_db = np.float32(10.0) * np.log10(np.maximum(peak, np.float32(1e-10))) - np.float32(ref_db)
+    floor_db = max(peak_db, -top_db) - top_db
+
+    for start in range(0, mel_spec.shape[-1], block_frames):
+        tile = mel_spec[..., start:start + block_frames]
+        if scale != 1.0:
+            tile *= scale
+        np.maximum(tile, 1e-10, out=tile)
+        np.log10(tile, out=tile)
+        tile *= 10.0
+        tile -= ref_db
+        np.maximum(tile, floor_db, out=tile)
+    return mel_spec
+
+
+def _log_mel_spectrogram(
+    audio: np.ndarray,
+    mel_basis: np.ndarray,
+    window: np.ndarray,
+    hop_length: int,
+    top_db: float = 80.0
+) -> np.ndarray:
+    """
+    Compute a log-mel spectrogram equivalent to librosa's
+    `power_to_db(melspectrogram(...), ref=np.max)` with default arguments
+    (centered STFT with zero padding).
+
+    Returns:
+        (n_mels, frames) float32 array in dB relative to the peak
+    """
+    padded = np.pad(audio.astype(np.float32, copy=False), len(window) // 2)
+    return _power_to_db(_mel_power(padded, mel_basis, window, hop_length), top_db)
+
+
+def _streaming_log_mel_spectrogram(
+    blocks: Iterable[np.ndarray],
+    mel_basis: np.ndarray,
+    window: np.ndarray,
+    hop_length: int,
+    top_db: float = 80.0
+) -> Tuple[np.ndarray, int]:
+    """
+    Same result as `_log_mel_spectrogram` on the peak-normalized
+    concatenation of `blocks`, without ever holding the whole signal.
+
+    Each block is framed as soon as it arrives; samples that don't yet fill
+    a frame are carried into the next block. Peak normalization only scales
+    the power spectrogram by 1/peak^2, so it is applied once at the end.
+
+    Returns:
+        ((n_mels, frames) float32 array in dB, number of input samples)
+    """
+    n_fft = len(window)
+    carry = np.zeros(n_fft // 2, dtype=np.float32)  # centered STFT padding
+    parts = []
+    num_samples = 0
+    peak = 0.0
+
+    def consume(signal: np.ndarray) -> np.ndarray:
+        n_frames = (len(signal) - n_fft) // hop_length + 1 if len(signal) >= n_fft else 0
+        if n_frames:
+            parts.append(_mel_power(
+                signal[:(n_frames - 1) * hop_length + n_fft], mel_basis, window, hop_length
+            ))
+        return signal[n_frames * hop_length:]
+
+    for block in blocks:
+        if not len(block):
+            continue
+        num_samples += len(block)
+        peak = max(peak, float(np.abs(block).max()))
+        carry = consume(np.concatenate((carry, block)))
+    consume(np.concatenate((carry, np.zeros(n_fft // 2, dtype=np.float32))))
+
+    mel_spec = np.concatenate(parts, axis=1) if parts else np.zeros((mel_basis.shape[0], 0), np.float32)
+    # Peak normalization (as librosa.util.normalize) expressed on the power scale
+    scale = 1.0 / (peak * peak) if peak > np.finfo(np.float32).tiny else 1.0
+    return _power_to_db(mel_spec, top_db, scale), num_samples
+
+
+def _window_stats(
+    mel_spec: np.ndarray,
+    frame_starts: np.ndarray,
+    frames_per_window: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of every window `mel_spec[:, t:t + frames_per_window]`.
+
+    Computed for all windows at once from float64 prefix sums of the per-frame
+    sums and sums of squares, instead of two reductions over each window.
+
+    Returns:
+        (mean, std) float32 arrays shaped (windows, 1, 1, 1) for broadcasting
+        against a (windows, 1, n_mels, frames) batch
+    """
+    frame_sum = np.concatenate(([0.0], np.cumsum(mel_spec.sum(axis=0, dtype=np.float64))))
+    frame_sq_sum = np.concatenate(([0.0], np.cumsum(np.square(mel_spec, dtype=np.float64).sum(axis=0))))
+
+    ends = frame_starts + frames_per_window
+    count = mel_spec.shape[0] * frames_per_window
+    mean = (frame_sum[ends] - frame_sum[frame_starts]) / count
+    var = (frame_sq_sum[ends] - frame_sq_sum[frame_starts]) / count - mean * mean
+    std = np.sqrt(np.maximum(var, 0.0))
+
+    shape = (-1, 1, 1, 1)
+    return mean.astype(np.float32).reshape(shape), std.astype(np.float32).reshape(shape)
+
+
+def _pinned_empty(shape: Tuple[int, ...], dtype: type) -> np.ndarray:
+    """
+    Like np.empty, but in page-locked host memory when torch with CUDA is
+    available, so host-to-device copies from it are a single DMA transfer.
+    Falls back to ordinary pageable memory.
+    """
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch_dtype = torch.from_numpy(np.empty(0, dtype=dtype)).dtype
+            # The returned array keeps the pinned tensor alive via its base
+            return torch.empty(shape, dtype=torch_dtype, pin_memory=True).numpy()
+    except Exception:
+        pass
+    return np.empty(shape, dtype=dtype)
+
+
+def _model_input_dtype(session: 'ort.InferenceSession') -> type:
+    """NumPy dtype of the model input: float16 for half-precision exports, else float32."""
+    return np.float16 if session.get_inputs()[0].type == 'tensor(float16)' else np.float32
+
+
+def _model_output_dtype(session: 'ort.InferenceSession') -> type:
+    """NumPy dtype of the model output, as for `_model_input_dtype`."""
+    return np.float16 if session.get_outputs()[0].type == 'tensor(float16)' else np.float32
+
+
+def _prefetch(items: Iterable, max_pending: int = 2) -> Iterator:
+    """
+    Produce items from an iterable on a background thread.
+
+    At most `max_pending` items are buffered, so the producer runs ahead of
+    the consumer by a bounded amount. Exceptions raised by the producer are
+    re-raised in the consuming thread.
+    """
+    pending: queue.Queue = queue.Queue(maxsize=max_pending)
+
+    def produce():
+        try:
+            for item in items:
+                pending.put((True, item))
+            pending.put((True, StopIteration))
+        except BaseException as e:
+            pending.put((False, e))
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    while True:
+        ok, item = pending.get()
+        if not ok:
+            raise item
+        if item is StopIteration:
+            return
+        yield item
+
+
 class AudioEventDetector(WorkerBase):
     """Worker for detecting audio events using ONNX model."""
 
     MODEL_VERSION = "v1.0.0"
+    GPU_BATCH_SIZE = 128
+    CPU_BATCH_SIZE = 32
+    PROGRESS_INTERVAL_S = 0.2
+    # Input of models exported with ml_training/embed_featurizer.py, which
+    # compute the features themselves from raw audio windows
+    PCM_INPUT_NAME = 'audio_pcm'
+    # Their second input: the file's top_db floor in dB, computed once per file
+    FLOOR_INPUT_NAME = 'floor_db'
+    VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v'}
+
+    def __init__(self):
+        super().__init__()
+        # Mel filterbank and STFT window, built on first use and reused
+        self._mel_filters: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        # Inference sessions keyed by (model_path, mtime), reused across jobs
+        # when running as a long-lived worker (--serve)
+        self._session_cache: Dict[Tuple[str, float], 'ort.InferenceSession'] = {}
+        self._session_lock = threading.Lock()
 
     def validate_input(self, input_data: Dict[str, Any]) -> None:
         """Validate input parameters."""
@@ -96,22 +336,76 @@ class AudioEventDetector(WorkerBase):
 
         write_progress(0, "Loading audio file...")
 
-        # Import heavy dependencies here to avoid slow startup for validation
-        import librosa
-        import onnxruntime as ort
-
         # Check if input is a video file and extract audio if needed
         audio_file = self._handle_video_input(input_file)
 
-        # Load and preprocess audio
-        audio, sr = librosa.load(audio_file, sr=SAMPLE_RATE, mono=True)
-        audio = librosa.util.normalize(audio)
-        total_duration = len(audio) / SAMPLE_RATE
+        write_progress(5, "Loading model...")
+
+        ort_session = self._get_session(model_path)
+        using_gpu = 'CUDAExecutionProvider' in ort_session.get_providers()
+        takes_pcm = ort_session.get_inputs()[0].name == self.PCM_INPUT_NAME
+
+        if takes_pcm:
+            write_progress(10, "Loading audio...")
+            audio = self._load_audio(audio_file)
+            num_samples = len(audio)
+        else:
+            write_progress(10, "Computing mel spectrogram...")
+            full_mel_spec_db, num_samples = self._compute_log_mel(audio_file, using_gpu)
+        total_duration = num_samples / SAMPLE_RATE
 
         write_log(f"Loaded audio: {total_duration:.1f}s duration", "info")
-        write_progress(10, "Loading model...")
+        write_progress(20, "Running inference...")
+
+        # Run sliding window inference
+        if takes_pcm:
+            write_log("Model embeds featurization, feeding raw audio windows", "info")
+            predictions = self._run_pcm_inference(audio, ort_session, config)
+        else:
+            predictions = self._run_inference(
+                full_mel_spec_db, num_samples, ort_session, config
+            )
+
+        write_progress(75, "Post-processing results...")
+
+        # Post-process predictions into segments
+        segments = self._postprocess_predictions(predictions, config)
+
+        # Calculate detected duration
+        detected_duration = sum(
+            s.end_seconds - s.start_seconds for s in segments
+        )
+
+        write_progress(100, "Complete")
+
+        # Build result
+        result = AudioDetectionResult(
+            segments=segments,
+            total_duration_seconds=total_duration,
+            detected_duration_seconds=detected_duration,
+            model_version=self.MODEL_VERSION
+        )
+
+        return result.to_dict()
+
+    def _get_session(self, model_path: str) -> 'ort.InferenceSession':
+        """Return the cached session for this model file, loading it if needed."""
+        # Keyed on mtime too, so a retrained model written to the same path is picked up
+        key = (os.path.abspath(model_path), os.path.getmtime(model_path))
+        # Session creation isn't thread-safe; concurrent callers wait for one load
+        with self._session_lock:
+            if key not in self._session_cache:
+                # Only the latest model is kept so device memory doesn't grow per retrain
+                self._session_cache = {key: self._load_model(model_path)}
+            else:
+                write_log("Reusing loaded model session", "info")
+            return self._session_cache[key]
+
+    def _load_model(self, model_path: str) -> 'ort.InferenceSession':
+        """Load the ONNX model with GPU acceleration if available."""
+        # Import heavy dependencies here to avoid slow startup for validation
+        import onnxruntime as ort
 
-        # Load ONNX model with GPU acceleration if available
         try:
             # Try CUDA first (GPU), fall back to CPU if not available
             available_providers = ort.get_available_providers()
@@ -119,22 +413,27 @@ class AudioEventDetector(WorkerBase):
 
             if 'CUDAExecutionProvider' in available_providers:
                 # Try to create session with CUDA provider explicitly
-                cuda_options = {
-                    'device_id': 0,
-                    'arena_extend_strategy': 'kNextPowerOfTwo',
-                    'gpu_mem_limit': 4 * 1024 * 1024 * 1024,  # 4GB limit
-                    'cudnn_conv_algo_search': 'EXHAUSTIVE',
-                    'do_copy_in_default_stream': True,
-                }
+                cuda_options = self._cuda_options()
 
                 providers = [
                     ('CUDAExecutionProvider', cuda_options),
                     'CPUExecutionProvider'
                 ]
-                write_log("Attempting to load model with CUDA...", "info")
+
+                # TensorRT fuses the whole CNN and runs it in FP16; CUDA and
+                # CPU stay in the list for any nodes TensorRT can't take
+                trt_options = None
+                if 'TensorrtExecutionProvider' in available_providers:
+                    trt_options = self._tensorrt_options(model_path)
+                if trt_options is not None:
+                    providers.insert(0, ('TensorrtExecutionProvider', trt_options))
+                    write_log("Attempting to load model with TensorRT...", "info")
+                else:
+                    write_log("Attempting to load model with CUDA...", "info")
 
                 ort_session = ort.InferenceSession(
                     model_path,
+                    sess_options=self._session_options(),
                     providers=providers
                 )
 
@@ -142,55 +441,355 @@ class AudioEventDetector(WorkerBase):
                 actual_provider = ort_session.get_providers()[0]
                 write_log(f"Model loaded with provider: {actual_provider}", "info")
 
-                if actual_provider == 'CUDAExecutionProvider':
+                if actual_provider == 'TensorrtExecutionProvider':
+                    write_log("✓ Successfully using GPU acceleration (TensorRT)", "info")
+                elif actual_provider == 'CUDAExecutionProvider':
                     write_log("✓ Successfully using GPU acceleration (CUDA)", "info")
                 else:
                     write_log(f"WARNING: CUDA available but fell back to {actual_provider}", "warning")
                     write_log("Possible reasons: missing cuDNN, incompatible CUDA version, or model incompatibility", "warning")
             else:
-                providers = ['CPUExecutionProvider']
                 write_log("CUDA not available, using CPU", "info")
-                ort_session = ort.InferenceSession(
-                    model_path,
-                    providers=providers
-                )
+                ort_session = self._create_cpu_session(model_path)
         except Exception as e:
             write_log(f"Error loading model with CUDA: {e}", "error")
             write_log("Falling back to CPU...", "warning")
             # Fallback to CPU only
-            ort_session = ort.InferenceSession(
-                model_path,
-                providers=['CPUExecutionProvider']
-            )
+            ort_session = self._create_cpu_session(model_path)
 
-        write_progress(20, "Running inference...")
+        return ort_session
 
-        # Run sliding window inference
-        predictions = self._run_inference(
-            audio, ort_session, config
-        )
+    def _cuda_options(self) -> Dict[str, Any]:
+        """
+        CUDA provider options.
+
+        ORT passes every provider option to the EP as a string, so only plain
+        str/int values belong here (an OrtArenaCfg object would be stringified
+        and rejected, failing the whole CUDA session). DEFAULT algo search
+        avoids the long cuDNN benchmarking pass that EXHAUSTIVE does on every
+        session, and kSameAsRequested keeps the arena sized to what this small
+        CNN actually needs; anything grown past that is released again by
+        per-run shrinkage.
+        """
+        return {
+            'device_id': 0,
+            'arena_extend_strategy': 'kSameAsRequested',
+            'cudnn_conv_algo_search': 'DEFAULT',
+            'do_copy_in_default_stream': 1,
+        }
 
-        write_progress(75, "Post-processing results...")
+    def _tensorrt_options(self, model_path: str) -> Optional[Dict[str, Any]]:
+        """
+        TensorRT provider options with an on-disk engine cache, or None if the
+        model shouldn't run under TensorRT.
 
-        # Post-process predictions into segments
-        segments = self._postprocess_predictions(predictions, config)
+        Building an engine takes far longer than a typical job, so engines are
+        cached next to the model. The optimization profile spans batch sizes
+        1..GPU_BATCH_SIZE of the model's own input shape so the trailing
+        partial batch doesn't trigger a rebuild.
+        """
+        import onnx
+
+        model_input = onnx.load(model_path, load_external_data=False).graph.input[0]
+        # FP16 would distort an embedded featurizer's dB features, as int8 does
+        if model_input.name == self.PCM_INPUT_NAME:
+            write_log("Model embeds featurization, skipping TensorRT", "info")
+            return None
+
+        sample_dims = [dim.dim_value for dim in model_input.type.tensor_type.shape.dim[1:]]
+        if not all(sample_dims):
+            write_log(f"Model input {model_input.name} has dynamic dimensions, skipping TensorRT", "info")
+            return None
+
+        cache_dir = Path(model_path).parent / 'trt_cache'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        input_shape = 'x'.join(str(dim) for dim in sample_dims)
+        return {
+            'device_id': 0,
+            'trt_engine_cache_enable': True,
+            'trt_engine_cache_path': str(cache_dir),
+            'trt_fp16_enable': True,
+            'trt_max_workspace_size': 1 << 30,
+            'trt_profile_min_shapes': f"{model_input.name}:1x{input_shape}",
+            'trt_profile_opt_shapes': f"{model_input.name}:{self.GPU_BATCH_SIZE}x{input_shape}",
+            'trt_profile_max_shapes': f"{model_input.name}:{self.GPU_BATCH_SIZE}x{input_shape}",
+        }
 
-        # Calculate detected duration
-        detected_duration = sum(
-            s.end_seconds - s.start_seconds for s in segments
+    def _session_options(self) -> 'ort.SessionOptions':
+        """
+        Session options shared by the CPU and GPU sessions.
+
+        The model is a small sequential CNN: all graph fusions on, nodes run in
+        order on one inter-op thread, and intra-op threads capped at half the
+        logical cores (hyperthread siblings only add contention on small convs)
+        this process may run on, so pinned pool processes don't oversubscribe.
+        """
+        import onnxruntime as ort
+
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        sess_options.inter_op_num_threads = 1
+        if hasattr(os, 'sched_getaffinity'):
+            num_cpus = len(os.sched_getaffinity(0))
+        else:
+            num_cpus = os.cpu_count() or 2
+        sess_options.intra_op_num_threads = max(1, num_cpus // 2)
+        return sess_options
+
+    def _create_cpu_session(self, model_path: str) -> 'ort.InferenceSession':
+        """
+        Create a CPU inference session, preferring an int8 copy of the model.
+
+        The model is dynamically quantized once and cached next to the original.
+        Quantized convolutions only pay off on CPUs with fast int8 dot products
+        (e.g. VNNI), so both variants are timed on a probe batch and the
+        faster one is used.
+        """
+        import onnxruntime as ort
+
+        sess_options = self._session_options()
+
+        session = ort.InferenceSession(
+            model_path, sess_options=sess_options, providers=['CPUExecutionProvider']
         )
 
-        write_progress(100, "Complete")
+        # Quantizing an embedded featurizer's mel projection would distort
+        # the dB features, so those models always run in fp32
+        if session.get_inputs()[0].name == self.PCM_INPUT_NAME:
+            return session
 
-        # Build result
-        result = AudioDetectionResult(
-            segments=segments,
-            total_duration_seconds=total_duration,
-            detected_duration_seconds=detected_duration,
-            model_version=self.MODEL_VERSION
+        int8_path = self._get_int8_model_path(model_path)
+        if int8_path is None:
+            return session
+
+        try:
+            int8_session = ort.InferenceSession(
+                int8_path, sess_options=sess_options, providers=['CPUExecutionProvider']
+            )
+            fp32_time = self._time_probe_batch(session)
+            int8_time = self._time_probe_batch(int8_session)
+        except Exception as e:
+            write_log(f"Could not load int8 model, using fp32: {e}", "warning")
+            return session
+
+        write_log(f"CPU probe batch: fp32 {fp32_time * 1000:.1f}ms, int8 {int8_time * 1000:.1f}ms", "info")
+        if int8_time < fp32_time:
+            write_log("Using int8 quantized model on CPU", "info")
+            return int8_session
+        return session
+
+    def _get_int8_model_path(self, model_path: str) -> Optional[str]:
+        """Return the path of the int8 model, quantizing it if missing or stale."""
+        int8_path = str(Path(model_path).with_suffix('.int8.onnx'))
+
+        if not os.path.exists(int8_path) or os.path.getmtime(int8_path) < os.path.getmtime(model_path):
+            try:
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+
+                write_log(f"Quantizing model to int8: {int8_path}", "info")
+                quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+            except Exception as e:
+                write_log(f"Int8 quantization failed, using fp32 model: {e}", "warning")
+                return None
+
+        return int8_path
+
+    def _time_probe_batch(self, session: 'ort.InferenceSession', repeats: int = 3) -> float:
+        """Average wall time of one CPU-sized batch, after a warm-up run."""
+        model_input = session.get_inputs()[0]
+        # The batch dimension is symbolic; the rest are fixed by the export
+        shape = [dim if isinstance(dim, int) else self.CPU_BATCH_SIZE for dim in model_input.shape]
+        probe = {model_input.name: np.zeros(shape, dtype=_model_input_dtype(session))}
+        session.run(None, probe)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            session.run(None, probe)
+        return (time.perf_counter() - start) / repeats
+
+    def _compute_log_mel(self, audio_file: str, using_gpu: bool) -> Tuple[Any, int]:
+        """
+        Compute the full log-mel spectrogram of an audio or video file.
+
+        On GPU the whole file is loaded and transformed with torch, and the
+        spectrogram is returned as a CUDA tensor that stays on the device. On CPU
+        (or if the GPU transform is unavailable) files libsndfile or PyAV can
+        decode are streamed: blocks are decoded and resampled on a background
+        thread while the previous block is being transformed, so memory stays
+        bounded by a block plus the spectrogram itself.
+
+        Returns:
+            ((n_mels, frames) dB spectrogram, number of samples at SAMPLE_RATE);
+            the spectrogram is an ndarray, or a CUDA torch tensor on the GPU path
+        """
+        mel_basis, window = self._get_mel_filters(N_FFT, N_MELS)
+
+        write_log("Computing full mel spectrogram (batched optimization)...", "info")
+        if using_gpu:
+            audio = self._load_audio(audio_file)
+            full_mel_spec_db = self._compute_mel_spectrogram_db_gpu(audio, mel_basis, window, HOP_LENGTH)
+            if full_mel_spec_db is None:
+                full_mel_spec_db = _log_mel_spectrogram(audio, mel_basis, window, HOP_LENGTH)
+            return full_mel_spec_db, len(audio)
+
+        blocks = self._open_audio_blocks(audio_file)
+        if blocks is None:
+            audio = self._load_audio(audio_file)
+            return _log_mel_spectrogram(audio, mel_basis, window, HOP_LENGTH), len(audio)
+
+        return _streaming_log_mel_spectrogram(
+            _prefetch(blocks, max_pending=2), mel_basis, window, HOP_LENGTH
         )
 
-        return result.to_dict()
+    def _open_audio_blocks(self, audio_file: str) -> Optional[Iterator[np.ndarray]]:
+        """Return a block reader for the file, or None if it can't be streamed."""
+        import soundfile as sf
+
+        if Path(audio_file).suffix.lower() in self.VIDEO_EXTENSIONS:
+            return self._iter_video_audio_blocks(audio_file)
+
+        try:
+            sf.info(audio_file)
+        except sf.LibsndfileError:
+            return None
+        return self._iter_audio_blocks(audio_file)
+
+    def _iter_audio_blocks(self, audio_file: str, block_seconds: int = 30) -> Iterator[np.ndarray]:
+        """
+        Read an audio file in blocks as mono float32 at SAMPLE_RATE.
+
+        Resampling uses a streaming soxr resampler with the same HQ settings
+        as `_load_audio`, so block boundaries leave no seams.
+        """
+        import soundfile as sf
+
+        with sf.SoundFile(audio_file) as f:
+            resampler = None
+            if f.samplerate != SAMPLE_RATE:
+                import soxr
+
+                resampler = soxr.ResampleStream(
+                    f.samplerate, SAMPLE_RATE, 1, dtype='float32', quality='HQ'
+                )
+
+            for block in f.blocks(blocksize=f.samplerate * block_seconds, dtype='float32', always_2d=True):
+                mono = block.mean(axis=1, dtype=np.float32)
+                if resampler is not None:
+                    mono = resampler.resample_chunk(mono)
+                yield mono
+
+            if resampler is not None:
+                yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+    def _iter_video_audio_blocks(self, video_file: str, block_seconds: int = 30) -> Iterator[np.ndarray]:
+        """
+        Demux and decode the first audio stream of a video with PyAV, yielding
+        mono float32 blocks at SAMPLE_RATE without going through a temp file.
+        Without PyAV the audio is piped from the ffmpeg CLI instead.
+        """
+        import importlib.util
+
+        if importlib.util.find_spec('av') is None:
+            yield from self._iter_ffmpeg_audio_blocks(video_file, block_seconds)
+            return
+
+        import av
+
+        block_samples = SAMPLE_RATE * block_seconds
+        pending: List[np.ndarray] = []
+        pending_samples = 0
+
+        with av.open(video_file) as container:
+            if not container.streams.audio:
+                raise ValueError(f"No audio stream found in video: {video_file}")
+
+            stream = container.streams.audio[0]
+            resampler = av.AudioResampler(format='flt', layout='mono', rate=SAMPLE_RATE)
+
+            def resampled():
+                for frame in container.decode(stream):
+                    yield from resampler.resample(frame)
+                yield from resampler.resample(None)  # flush
+
+            # Decoded frames are ~1k samples; group them into blocks so the
+            # consumer isn't dominated by per-frame overhead
+            for frame in resampled():
+                chunk = frame.to_ndarray()[0]
+                pending.append(chunk)
+                pending_samples += len(chunk)
+                if pending_samples >= block_samples:
+                    yield np.concatenate(pending)
+                    pending, pending_samples = [], 0
+
+        if pending:
+            yield np.concatenate(pending)
+
+    def _iter_ffmpeg_audio_blocks(self, video_file: str, block_seconds: int = 30) -> Iterator[np.ndarray]:
+        """
+        Decode a video's audio with an ffmpeg subprocess that writes mono
+        float32 PCM at SAMPLE_RATE to stdout, yielding it in blocks.
+        """
+        import subprocess
+
+        cmd = [
+            'ffmpeg', '-v', 'error', '-nostdin', '-i', video_file,
+            '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 'f32le', '-'
+        ]
+        block_bytes = SAMPLE_RATE * block_seconds * 4
+
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+            while True:
+                # readinto fills the whole block unless ffmpeg hit EOF
+                buffer = bytearray(block_bytes)
+                n_bytes = proc.stdout.readinto(buffer)
+                if not n_bytes:
+                    break
+                yield np.frombuffer(buffer, dtype=np.float32, count=n_bytes // 4)
+            stderr = proc.stderr.read().decode(errors='replace').strip()
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode audio from {video_file}: {stderr}")
+
+    def _load_audio(self, audio_file: str) -> np.ndarray:
+        """
+        Load an audio file as peak-normalized mono float32 at SAMPLE_RATE.
+
+        Reads through libsndfile (PyAV for video containers) and resamples
+        with soxr (the same HQ resampler librosa uses) when the file rate
+        differs; formats that libsndfile cannot decode fall back to
+        librosa.load.
+        """
+        import soundfile as sf
+
+        try:
+            if Path(audio_file).suffix.lower() in self.VIDEO_EXTENSIONS:
+                blocks = list(self._iter_video_audio_blocks(audio_file))
+                audio = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+                file_sr = SAMPLE_RATE
+            else:
+                audio, file_sr = sf.read(audio_file, dtype='float32', always_2d=False)
+        except sf.LibsndfileError as e:
+            import librosa
+
+            write_log(f"soundfile could not decode input, using librosa: {e}", "info")
+            audio, file_sr = librosa.load(audio_file, sr=SAMPLE_RATE, mono=True)
+
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+
+        if file_sr != SAMPLE_RATE:
+            import soxr
+
+            audio = soxr.resample(audio, file_sr, SAMPLE_RATE, quality='HQ')
+
+        # Peak normalization (same as librosa.util.normalize), in place
+        peak = float(np.abs(audio).max()) if audio.size else 0.0
+        if peak > np.finfo(np.float32).tiny:
+            audio /= peak
+
+        return audio
 
     def _handle_video_input(self, input_file: str) -> str:
         """
@@ -202,29 +801,31 @@ class AudioEventDetector(WorkerBase):
         Returns:
             Path to audio file (either original or extracted temp file)
         """
-        # Video file extensions
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v'}
         file_ext = Path(input_file).suffix.lower()
 
         # If it's not a video file, return as-is
-        if file_ext not in video_extensions:
+        if file_ext not in self.VIDEO_EXTENSIONS:
             return input_file
 
         write_progress(5, "Extracting audio from video...")
         write_log(f"Detected video file: {file_ext}", "info")
 
-        # Extract audio using librosa (which uses audioread/soundfile under the hood)
-        # librosa.load can handle many video formats directly
-        # If it fails, we could add ffmpeg extraction as a fallback
-        try:
-            # librosa can extract audio from many video containers
-            # We'll just return the original file and let librosa handle it
-            write_log("Using librosa to extract audio from video", "info")
+        # PyAV (or an ffmpeg pipe) decodes the audio stream straight into memory
+        # during feature extraction; only without either fall back to a
+        # temporary WAV via pydub
+        import importlib.util
+        import shutil
+
+        if importlib.util.find_spec('av') is not None:
+            write_log("Decoding video audio directly with PyAV", "info")
             return input_file
-        except Exception as e:
-            # If librosa can't handle it, try using pydub with ffmpeg
-            write_log(f"Librosa extraction failed, trying pydub: {e}", "warning")
-            return self._extract_audio_with_pydub(input_file)
+
+        if shutil.which('ffmpeg') is not None:
+            write_log("PyAV not installed, piping video audio from ffmpeg", "info")
+            return input_file
+
+        write_log("Neither PyAV nor ffmpeg found, extracting audio with pydub", "warning")
+        return self._extract_audio_with_pydub(input_file)
 
     def _extract_audio_with_pydub(self, video_file: str) -> str:
         """
@@ -263,124 +864,498 @@ class AudioEventDetector(WorkerBase):
 
     def _run_inference(
         self,
-        audio: np.ndarray,
+        full_mel_spec_db: Any,
+        num_samples: int,
         model: 'ort.InferenceSession',
         config: ModelConfig
-    ) -> List[Tuple[float, float]]:
-       
-        import librosa
+    ) -> np.ndarray:
+        """
+        Run the model over sliding windows of the spectrogram.
 
+        Returns:
+            (windows, 2) float64 array of (window_start_seconds, probability)
+        """
         sr = SAMPLE_RATE
-        window_samples = int(config.window_size_ms * sr / 1000)
-        hop_samples = int(config.hop_size_ms * sr / 1000)
-
-        n_mels = 128
-        n_fft = 2048
-        hop_length = 512
-        model_time_frames = 32
+        n_mels = full_mel_spec_db.shape[0]
+        hop_length = HOP_LENGTH
+        # (batch, 1, n_mels, frames), with the batch dimension symbolic
+        model_input = model.get_inputs()[0]
+        input_name = model_input.name
+        model_time_frames = model_input.shape[3] if isinstance(model_input.shape[3], int) else 32
 
         using_gpu = 'CUDAExecutionProvider' in model.get_providers()
-        batch_size = 32 if using_gpu else 8
+        batch_size = self.GPU_BATCH_SIZE if using_gpu else self.CPU_BATCH_SIZE
 
         write_log(f"Batch size: {batch_size} ({'GPU' if using_gpu else 'CPU'})", "info")
 
-        write_log("Computing full mel spectrogram (batched optimization)...", "info")
-        full_mel_spec = librosa.feature.melspectrogram(
-            y=audio, sr=sr, n_mels=n_mels,
-            n_fft=n_fft, hop_length=hop_length
+        frames_per_window = model_time_frames
+        window_frame_starts = self._window_frame_starts(
+            num_samples, full_mel_spec_db.shape[1], frames_per_window, config
         )
-        full_mel_spec_db = librosa.power_to_db(full_mel_spec, ref=np.max)
 
-        frames_per_window = model_time_frames
-        frames_per_hop = int(hop_samples / hop_length)
+        # Column 0 holds window start times, column 1 is filled batch by batch;
+        # silent windows never reach the model and keep probability 0
+        predictions = np.zeros((len(window_frame_starts), 2), dtype=np.float64)
+        predictions[:, 0] = window_frame_starts * hop_length / sr
+
+        # Spectrograms computed on the GPU stay there as torch tensors; only
+        # the per-frame peaks come back for silence gating
+        on_device = not isinstance(full_mel_spec_db, np.ndarray)
+        if on_device:
+            frame_peak_db = full_mel_spec_db.amax(dim=0).cpu().numpy()
+        else:
+            frame_peak_db = full_mel_spec_db.max(axis=0)
+
+        active_rows = self._find_active_windows(
+            frame_peak_db, window_frame_starts, frames_per_window, config.silence_threshold_db
+        )
+        if len(active_rows) < len(window_frame_starts):
+            write_log(f"Skipping {len(window_frame_starts) - len(active_rows)}/{len(window_frame_starts)} silent windows", "info")
+        window_frame_starts = window_frame_starts[active_rows]
+        total_windows = max(1, len(window_frame_starts))
+        input_dtype = _model_input_dtype(model)
+        if input_dtype == np.float16:
+            write_log("Model takes FP16 input", "info")
+
+        # Batches are built ahead on a background thread. Buffers in flight:
+        # one being consumed, up to two queued, one being filled.
+        max_pending = 2
+
+        # On GPU, bind device-resident input buffers instead of letting
+        # session.run() allocate and copy
+        io_binding = None
+        if using_gpu:
+            import onnxruntime as ort
+
+            io_binding = model.io_binding()
+            output_name = model.get_outputs()[0].name
+            # Full batches write their probabilities into a preallocated
+            # device buffer instead of ORT allocating a new output per run
+            device_output = ort.OrtValue.ortvalue_from_shape_and_type(
+                [batch_size, 1], _model_output_dtype(model), 'cuda', 0
+            )
 
-        predictions = []
-        total_windows = max(1, (full_mel_spec_db.shape[1] - frames_per_window) // frames_per_hop + 1)
+            # Return arena memory grown during a run to the device after it
+            # so the footprint stays flat across long files
+            run_options = ort.RunOptions()
+            run_options.add_run_config_entry('memory.enable_memory_arena_shrinkage', 'gpu:0')
+
+            # Warm up with one max-size batch so allocations and kernel
+            # selection happen before the timed loop
+            model.run(None, {input_name: np.zeros(
+                (batch_size, 1, n_mels, frames_per_window), dtype=input_dtype
+            )}, run_options)
+
+        if on_device:
+            # Windows are gathered and normalized by torch on the GPU and
+            # handed to ORT without ever touching host memory
+            batches = self._iter_device_batches(
+                full_mel_spec_db, window_frame_starts, batch_size, frames_per_window, input_dtype
+            )
+        elif using_gpu:
+            device_inputs = [
+                ort.OrtValue.ortvalue_from_shape_and_type(
+                    [batch_size, 1, n_mels, frames_per_window], input_dtype, 'cuda', 0
+                )
+                for _ in range(max_pending + 2)
+            ]
+
+            def upload(batches):
+                # Copy each batch into its own device buffer on the producer
+                # thread, so the upload of batch N+1 overlaps with the kernels
+                # of batch N instead of running before them
+                for batch_num, (batch_idx, batch_frame_starts, batch_input) in enumerate(batches):
+                    if len(batch_input) == batch_size:
+                        device_batch = device_inputs[batch_num % len(device_inputs)]
+                        device_batch.update_inplace(batch_input)
+                    else:
+                        # Trailing partial batch: a one-off buffer of the right shape
+                        device_batch = ort.OrtValue.ortvalue_from_numpy(batch_input, 'cuda', 0)
+                    yield batch_idx, batch_frame_starts, device_batch
+
+            # Build and upload the next batch while the GPU runs the current one
+            batches = _prefetch(
+                # A host batch is copied out before the next one is built, so
+                # a single (pinned) host buffer is enough
+                upload(self._iter_batches(
+                    full_mel_spec_db, window_frame_starts, batch_size,
+                    frames_per_window, dtype=input_dtype, pinned=True
+                )),
+                max_pending=max_pending
+            )
+        else:
+            # ORT releases the GIL while it runs, so the next batch is sliced
+            # and normalized on another core in the meantime
+            batches = _prefetch(
+                self._iter_batches(
+                    full_mel_spec_db, window_frame_starts, batch_size,
+                    frames_per_window, num_buffers=max_pending + 2, dtype=input_dtype
+                ),
+                max_pending=max_pending
+            )
 
-        window_frame_starts = list(range(0, full_mel_spec_db.shape[1] - frames_per_window + 1, frames_per_hop))
+        last_progress_time = 0.0
+        for batch_idx, batch_frame_starts, batch_input in batches:
+            if io_binding is not None:
+                io_binding.bind_ortvalue_input(input_name, batch_input)
+                # Rebind each run: a bound output keeps the previous run's shape,
+                # so only full batches can use the preallocated buffer
+                if len(batch_frame_starts) == batch_size:
+                    io_binding.bind_ortvalue_output(output_name, device_output)
+                else:
+                    io_binding.bind_output(output_name, 'cuda', 0)
+                model.run_with_iobinding(io_binding, run_options)
+                batch_probs = io_binding.copy_outputs_to_cpu()[0][:, 0]
+            else:
+                outputs = model.run(None, {input_name: batch_input})
+                batch_probs = outputs[0][:, 0]
 
-        for batch_idx in range(0, len(window_frame_starts), batch_size):
-            batch_frame_starts = window_frame_starts[batch_idx:batch_idx + batch_size]
-            batch_features = []
+            if batch_idx < 3:
+                write_log(f"Batch {batch_idx} probs - min: {batch_probs.min():.4f}, max: {batch_probs.max():.4f}, mean: {batch_probs.mean():.4f}", "info")
 
-            for frame_start in batch_frame_starts:
-                mel_window = full_mel_spec_db[:, frame_start:frame_start + frames_per_window]
+            predictions[active_rows[batch_idx:batch_idx + len(batch_probs)], 1] = batch_probs
 
-                if mel_window.shape[1] < frames_per_window:
-                    mel_window = np.pad(mel_window, ((0, 0), (0, frames_per_window - mel_window.shape[1])))
+            # Rate-limit progress to wall-clock time: with large GPU batches a
+            # per-batch write (and flush) would dominate short batches
+            progress = batch_idx + len(batch_frame_starts)
+            now = time.monotonic()
+            if now - last_progress_time >= self.PROGRESS_INTERVAL_S or progress >= total_windows:
+                last_progress_time = now
+                percent = int((progress / total_windows) * 55) + 20  # 20-75% for inference
+                write_progress(percent, f"Running inference... ({progress}/{total_windows} windows)")
 
-                mel_window = (mel_window - mel_window.mean()) / (mel_window.std() + 1e-8)
-                batch_features.append(mel_window)
+        return predictions
 
-            batch_input = np.array(batch_features)[:, np.newaxis, :, :].astype(np.float32)
+    def _window_frame_starts(
+        self,
+        num_samples: int,
+        total_frames: int,
+        frames_per_window: int,
+        config: ModelConfig
+    ) -> np.ndarray:
+        """Spectrogram frame index at which each sliding window starts."""
+        window_samples = int(config.window_size_ms * SAMPLE_RATE / 1000)
+        hop_samples = int(config.hop_size_ms * SAMPLE_RATE / 1000)
+
+        # Map each window's start sample onto the spectrogram frame grid so the
+        # configured hop is honoured exactly (no drift from rounding the hop to
+        # a whole number of frames).
+        sample_starts = np.arange(0, max(1, num_samples - window_samples + 1), hop_samples)
+        window_frame_starts = sample_starts // HOP_LENGTH
+        return window_frame_starts[window_frame_starts + frames_per_window <= total_frames]
+
+    def _run_pcm_inference(
+        self,
+        audio: np.ndarray,
+        model: 'ort.InferenceSession',
+        config: ModelConfig
+    ) -> np.ndarray:
+        """
+        Run a model with embedded featurization over sliding windows of raw audio.
 
-            outputs = model.run(None, {'mel_spectrogram': batch_input})
-            batch_probs = outputs[0][:, 0]
+        Each window is the stretch of the centered-STFT-padded signal its
+        spectrogram frames cover, so the model sees the same STFT frames
+        `_run_inference` would slice from the full spectrogram. The top_db
+        floor depends on the whole file's peak, so it is computed here once
+        and fed alongside every batch (see ml_training/embed_featurizer.py).
 
-            if batch_idx < 3:
-                write_log(f"Batch {batch_idx} probs - min: {batch_probs.min():.4f}, max: {batch_probs.max():.4f}, mean: {batch_probs.mean():.4f}", "info")
+        Returns:
+            (windows, 2) float64 array of (window_start_seconds, probability)
+        """
+        input_names = [model_input.name for model_input in model.get_inputs()]
+        if self.FLOOR_INPUT_NAME not in input_names:
+            raise ValueError(
+                f"Model takes {self.PCM_INPUT_NAME} without {self.FLOOR_INPUT_NAME}; "
+                "re-export it with ml_training/embed_featurizer.py"
+            )
+        window_length = model.get_inputs()[0].shape[1]
+        frames_per_window = (window_length - N_FFT) // HOP_LENGTH + 1
+
+        padded = np.pad(audio, N_FFT // 2)
+
+        # Same floor as power_to_db(ref=max, top_db=80) over the full file
+        mel_basis, window = self._get_mel_filters(N_FFT, N_MELS)
+        peak_power = _mel_power(padded, mel_basis, window, HOP_LENGTH).max(initial=0.0)
+        floor_db = np.array([10.0 * np.log10(max(peak_power, 1e-10)) - 80.0], dtype=np.float32)
+        total_frames = 1 + len(audio) // HOP_LENGTH
+        window_frame_starts = self._window_frame_starts(
+            len(audio), total_frames, frames_per_window, config
+        )
 
-            for i, (frame_start, prob) in enumerate(zip(batch_frame_starts, batch_probs)):
-                window_start_sec = (frame_start * hop_length) / sr
-                predictions.append((window_start_sec, float(prob)))
+        predictions = np.zeros((len(window_frame_starts), 2), dtype=np.float64)
+        predictions[:, 0] = window_frame_starts * HOP_LENGTH / SAMPLE_RATE
+
+        # Silence gating as in _run_inference, on the sample peak (dB relative
+        # to the normalized file peak) of each hop-sized block of the window
+        n_blocks = -(-len(padded) // HOP_LENGTH)
+        block_peak = np.abs(np.pad(padded, (0, n_blocks * HOP_LENGTH - len(padded)))).reshape(
+            n_blocks, HOP_LENGTH
+        ).max(axis=1)
+        active_rows = self._find_active_windows(
+            20.0 * np.log10(np.maximum(block_peak, 1e-10)), window_frame_starts,
+            -(-window_length // HOP_LENGTH), config.silence_threshold_db
+        )
+        if len(active_rows) < len(window_frame_starts):
+            write_log(f"Skipping {len(window_frame_starts) - len(active_rows)}/{len(window_frame_starts)} silent windows", "info")
+        window_frame_starts = window_frame_starts[active_rows]
+        total_windows = max(1, len(window_frame_starts))
 
-            progress = batch_idx + len(batch_frame_starts)
-            update_frequency = batch_size
-            if progress % update_frequency == 0 or progress >= total_windows:
+        using_gpu = 'CUDAExecutionProvider' in model.get_providers()
+        batch_size = self.GPU_BATCH_SIZE if using_gpu else self.CPU_BATCH_SIZE
+        input_dtype = _model_input_dtype(model)
+
+        # One row per frame start; gathering a batch is a single fancy index
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window_length)[::HOP_LENGTH]
+
+        def iter_batches():
+            for batch_idx in range(0, len(window_frame_starts), batch_size):
+                batch_frame_starts = window_frame_starts[batch_idx:batch_idx + batch_size]
+                yield batch_idx, windows[batch_frame_starts].astype(input_dtype, copy=False)
+
+        last_progress_time = 0.0
+        for batch_idx, batch_input in _prefetch(iter_batches()):
+            batch_probs = model.run(
+                None, {self.PCM_INPUT_NAME: batch_input, self.FLOOR_INPUT_NAME: floor_db}
+            )[0][:, 0]
+            predictions[active_rows[batch_idx:batch_idx + len(batch_probs)], 1] = batch_probs
+
+            progress = batch_idx + len(batch_probs)
+            now = time.monotonic()
+            if now - last_progress_time >= self.PROGRESS_INTERVAL_S or progress >= total_windows:
+                last_progress_time = now
                 percent = int((progress / total_windows) * 55) + 20  # 20-75% for inference
                 write_progress(percent, f"Running inference... ({progress}/{total_windows} windows)")
 
         return predictions
 
+    def _find_active_windows(
+        self,
+        frame_peak_db: np.ndarray,
+        window_frame_starts: np.ndarray,
+        frames_per_window: int,
+        silence_threshold_db: float
+    ) -> np.ndarray:
+        """
+        Indices of windows whose loudest mel bin is above `silence_threshold_db`.
+
+        `frame_peak_db` is the spectrogram's maximum over mel bins per frame.
+        The spectrogram is in dB relative to the file's peak and clipped at
+        -80 dB, so windows at the floor are exact silence; after per-window
+        normalization they would reach the model as an all-zero input.
+        """
+        if not len(window_frame_starts):
+            return np.zeros(0, dtype=np.intp)
+
+        window_peak_db = np.lib.stride_tricks.sliding_window_view(
+            frame_peak_db, frames_per_window
+        )[window_frame_starts].max(axis=1)
+        return np.flatnonzero(window_peak_db > silence_threshold_db)
+
+    def _get_mel_filters(self, n_fft: int, n_mels: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the cached (mel_basis, hann_window) pair for these STFT settings."""
+        key = (n_fft, n_mels)
+        if key not in self._mel_filters:
+            import librosa
+
+            mel_basis = librosa.filters.mel(sr=SAMPLE_RATE, n_fft=n_fft, n_mels=n_mels)
+            window = np.hanning(n_fft + 1)[:-1].astype(np.float32)  # periodic Hann
+            self._mel_filters[key] = (mel_basis, window)
+        return self._mel_filters[key]
+
+    def _iter_batches(
+        self,
+        full_mel_spec_db: np.ndarray,
+        window_frame_starts: np.ndarray,
+        batch_size: int,
+        frames_per_window: int,
+        num_buffers: int = 1,
+        dtype: type = np.float32,
+        pinned: bool = False
+    ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        Yield (batch_idx, frame_starts, model_input) for each batch of windows.
+
+        Windows are gathered from a strided view of the precomputed
+        spectrogram straight into a preallocated batch buffer and normalized
+        in place to zero mean / unit variance. Buffers are reused round-robin,
+        so a yielded batch is only valid until `num_buffers` further batches
+        have been produced.
+
+        Normalization always runs in float32; for a float16 `dtype` the result
+        is cast into the half-precision buffer afterwards. With `pinned`, the
+        batch buffers are page-locked for faster uploads to the GPU.
+        """
+        n_mels = full_mel_spec_db.shape[0]
+
+        # (frames - frames_per_window + 1, n_mels, frames_per_window) view:
+        # entry t is the window starting at frame t, without copying anything
+        windows = np.lib.stride_tricks.sliding_window_view(
+            full_mel_spec_db, frames_per_window, axis=1
+        ).transpose(1, 0, 2)
+        means, stds = _window_stats(full_mel_spec_db, window_frame_starts, frames_per_window)
+        # Subtract-and-scale is the only pass over each gathered window
+        inv_stds = 1.0 / (stds + 1e-8)
+
+        allocate = _pinned_empty if pinned else np.empty
+        buffers = allocate(
+            (num_buffers, batch_size, 1, n_mels, frames_per_window), dtype
+        )
+        scratch = None
+        if buffers.dtype != np.float32:
+            scratch = np.empty((batch_size, 1, n_mels, frames_per_window), dtype=np.float32)
+
+        for batch_num, batch_idx in enumerate(range(0, len(window_frame_starts), batch_size)):
+            batch_frame_starts = window_frame_starts[batch_idx:batch_idx + batch_size]
+            batch_input = buffers[batch_num % num_buffers, :len(batch_frame_starts)]
+            work = batch_input if scratch is None else scratch[:len(batch_frame_starts)]
+
+            work[:, 0] = windows[batch_frame_starts]
+            work -= means[batch_idx:batch_idx + batch_size]
+            work *= inv_stds[batch_idx:batch_idx + batch_size]
+            if scratch is not None:
+                batch_input[...] = work
+            yield batch_idx, batch_frame_starts, batch_input
+
+    def _iter_device_batches(
+        self,
+        mel_spec_db: 'torch.Tensor',
+        window_frame_starts: np.ndarray,
+        batch_size: int,
+        frames_per_window: int,
+        dtype: type = np.float32
+    ) -> Iterator[Tuple[int, np.ndarray, 'ort.OrtValue']]:
+        """
+        GPU counterpart of `_iter_batches` for a spectrogram held on the device.
+
+        Windows are gathered from an unfolded view, normalized per window and
+        cast with torch ops, then wrapped as OrtValues through DLPack without
+        a copy. Each batch is a fresh device tensor kept alive by its OrtValue.
+        """
+        import torch
+        import onnxruntime as ort
+
+        # (frames - frames_per_window + 1, n_mels, frames_per_window) view
+        windows = mel_spec_db.unfold(1, frames_per_window, 1).permute(1, 0, 2)
+        starts = torch.from_numpy(window_frame_starts).to(mel_spec_db.device)
+        torch_dtype = torch.float16 if dtype == np.float16 else torch.float32
+
+        with torch.no_grad():
+            for batch_idx in range(0, len(window_frame_starts), batch_size):
+                batch = windows[starts[batch_idx:batch_idx + batch_size]].unsqueeze(1)
+                std, mean = torch.std_mean(batch, dim=(1, 2, 3), keepdim=True, unbiased=False)
+                batch = ((batch - mean) * (1.0 / (std + 1e-8))).to(torch_dtype).contiguous()
+
+                # ORT runs on its own CUDA stream; make sure the batch is ready
+                torch.cuda.current_stream().synchronize()
+                yield (
+                    batch_idx,
+                    window_frame_starts[batch_idx:batch_idx + batch_size],
+                    ort.OrtValue.from_dlpack(batch)
+                )
+
+    def _compute_mel_spectrogram_db_gpu(
+        self,
+        audio: np.ndarray,
+        mel_basis: np.ndarray,
+        window: np.ndarray,
+        hop_length: int,
+        top_db: float = 80.0
+    ) -> Optional['torch.Tensor']:
+        """
+        Compute the full log-mel spectrogram on CUDA with torch.stft.
+
+        Uses the same librosa filterbank and periodic Hann window as the CPU
+        path (zero-padded centered frames, power_to_db with ref=max and
+        top_db=80), so the features match what the model was trained on.
+        The result stays on the GPU for `_iter_device_batches`.
+
+        Returns:
+            (n_mels, frames) float32 CUDA tensor, or None if torch/CUDA is unavailable
+        """
+        try:
+            import torch
+        except ImportError:
+            return None
+
+        if not torch.cuda.is_available():
+            return None
+
+        try:
+            device = torch.device('cuda')
+            with torch.no_grad():
+                spectrum = torch.stft(
+                    torch.from_numpy(audio).to(device),
+                    n_fft=len(window),
+                    hop_length=hop_length,
+                    window=torch.from_numpy(window).to(device),
+                    center=True,
+                    pad_mode='constant',
+                    return_complex=True
+                )
+                mel_spec = torch.from_numpy(mel_basis).to(device) @ spectrum.abs().square_()
+
+                ref_db = 10.0 * torch.log10(mel_spec.max().clamp_min(1e-10))
+                mel_spec_db = 10.0 * torch.log10(mel_spec.clamp_min_(1e-10)) - ref_db
+                mel_spec_db = torch.maximum(mel_spec_db, mel_spec_db.max() - top_db)
+
+            write_log("Computed mel spectrogram on GPU (torch.stft)", "info")
+            return mel_spec_db
+        except Exception as e:
+            write_log(f"GPU mel spectrogram failed, falling back to CPU: {e}", "warning")
+            return None
+
     def _postprocess_predictions(
         self,
-        predictions: List[Tuple[float, float]],
+        predictions: np.ndarray,
         config: ModelConfig
     ) -> List[TimestampSegment]:
+        """
+        Merge above-threshold windows into segments.
+
+        `predictions` is the (windows, 2) array from `_run_inference`; any
+        sequence of (start_seconds, probability) pairs is accepted too.
+        """
         threshold = config.confidence_threshold
         min_duration = config.min_segment_duration_ms / 1000
         merge_gap = config.merge_gap_ms / 1000
         window_duration = config.window_size_ms / 1000
 
-        #Filter by threshold
-        positive_windows = [(t, p) for t, p in predictions if p >= threshold]
+        arr = np.asarray(predictions, dtype=np.float64).reshape(-1, 2)
 
-        write_log(f"Postprocessing: {len(positive_windows)}/{len(predictions)} windows above threshold {threshold}", "info")
+        # Filter by threshold
+        mask = arr[:, 1] >= threshold
+        times = arr[mask, 0]
+        probs = arr[mask, 1]
 
-        if not positive_windows:
-            return []
+        write_log(f"Postprocessing: {len(times)}/{len(arr)} windows above threshold {threshold}", "info")
 
-        segments = []
-        current_segment = {
-            'start': positive_windows[0][0],
-            'end': positive_windows[0][0] + window_duration,
-            'confidences': [positive_windows[0][1]]
-        }
+        if len(times) == 0:
+            return []
 
-        for start_time, prob in positive_windows[1:]:
-            if start_time <= current_segment['end'] + merge_gap:
-                current_segment['end'] = start_time + window_duration
-                current_segment['confidences'].append(prob)
-            else:
-                segments.append(current_segment)
-                current_segment = {
-                    'start': start_time,
-                    'end': start_time + window_duration,
-                    'confidences': [prob]
-                }
-
-        segments.append(current_segment)
-
-        result = []
-        for seg in segments:
-            duration = seg['end'] - seg['start']
-            if duration >= min_duration:
-                result.append(TimestampSegment(
-                    start_seconds=seg['start'],
-                    end_seconds=seg['end'],
-                    confidence=float(np.mean(seg['confidences'])),
-                    label='target_audio'
-                ))
+        # A new segment starts wherever a positive window begins more than
+        # merge_gap after the previous positive window ends
+        breaks = np.flatnonzero(times[1:] > (times[:-1] + window_duration) + merge_gap) + 1
+        first = np.concatenate(([0], breaks))
+        last = np.concatenate((breaks, [len(times)])) - 1
+
+        starts = times[first]
+        ends = times[last] + window_duration
+        confidences = np.add.reduceat(probs, first) / (last - first + 1)
+
+        # Filter by min duration
+        keep = ends - starts >= min_duration
+
+        result = [
+            TimestampSegment(
+                start_seconds=start,
+                end_seconds=end,
+                confidence=confidence,
+                label='target_audio'
+            )
+            for start, end, confidence in zip(
+                starts[keep].tolist(), ends[keep].tolist(), confidences[keep].tolist()
+            )
+        ]
 
         write_log(f"Postprocessing complete: {len(result)} segments after merging and filtering", "info")
         return result
@@ -388,8 +1363,15 @@ class AudioEventDetector(WorkerBase):
 
 def main():
     """Main entry point."""
-    worker = AudioEventDetector()
-    sys.exit(worker.run())
+    args = sys.argv[1:]
+    if '--serve' in args:
+        num_procs = next((int(a.split('=', 1)[1]) for a in args if a.startswith('--procs=')), 1)
+        if num_procs > 1:
+            # Batch mode: all stdin jobs spread over pinned worker processes
+            sys.exit(serve_pool(AudioEventDetector, num_procs))
+        # Long-lived mode: one JSON job per stdin line, model sessions stay loaded
+        sys.exit(AudioEventDetector().serve())
+    sys.exit(AudioEventDetector().run())
 
 
 if __name__ == '__main__':
@@ -26,13 +26,14 @@ _torch = None
 _torchaudio = None
 _librosa = None
 _np = None
+_soundfile = None
 _demucs_get_model = None
 _demucs_apply_model = None
 
 
 def _lazy_import_demucs():
     """Lazy import heavy ML modules only when needed."""
-    global HAS_DEMUCS, _torch, _torchaudio, _librosa, _np, _demucs_get_model, _demucs_apply_model
+    global HAS_DEMUCS, _torch, _torchaudio, _librosa, _np, _soundfile, _demucs_get_model, _demucs_apply_model
 
     if HAS_DEMUCS is not None:
         return HAS_DEMUCS
@@ -42,6 +43,7 @@ def _lazy_import_demucs():
         import torchaudio
         import librosa
         import numpy as np
+        import soundfile
         from demucs.pretrained import get_model
         from demucs.apply import apply_model
 
@@ -49,6 +51,7 @@ def _lazy_import_demucs():
         _torchaudio = torchaudio
         _librosa = librosa
         _np = np
+        _soundfile = soundfile
         _demucs_get_model = get_model
         _demucs_apply_model = apply_model
         HAS_DEMUCS = True
@@ -85,6 +88,9 @@ class AudioSeparatorWorker(WorkerBase):
         super().__init__()
         self.model = None
         self.device = None
+        # Resample transforms keyed by (orig_sr, target_sr, device); building
+        # one precomputes its sinc kernel
+        self._resamplers = {}
 
     def validate_input(self, input_data: Dict[str, Any]) -> None:
         # Lazy import on first validation
@@ -141,8 +147,9 @@ class AudioSeparatorWorker(WorkerBase):
         # Resample if needed (Demucs expects 44100 Hz)
         if sr != self.model.samplerate:
             write_log(f"Resampling from {sr} Hz to {self.model.samplerate} Hz")
-            resampler = _torchaudio.transforms.Resample(sr, self.model.samplerate)
-            wav = resampler(wav)
+            # Resample on the inference device, which the audio is moved to anyway
+            wav = wav.to(self.device)
+            wav = self._get_resampler(sr, self.model.samplerate)(wav)
             sr = self.model.samplerate
 
         # Convert to stereo if mono
@@ -151,6 +158,13 @@ class AudioSeparatorWorker(WorkerBase):
 
         return wav, sr
 
+    def _get_resampler(self, orig_sr: int, target_sr: int):
+        """Return a cached Resample transform on the inference device."""
+        key = (orig_sr, target_sr, str(self.device))
+        if key not in self._resamplers:
+            self._resamplers[key] = _torchaudio.transforms.Resample(orig_sr, target_sr).to(self.device)
+        return self._resamplers[key]
+
     def _separate_audio(self, wav):
         """Run the separation model."""
         write_progress(20, "Separating audio stems...")
@@ -185,38 +199,34 @@ class AudioSeparatorWorker(WorkerBase):
         """Save separated stems to output directory."""
         write_progress(80, "Saving separated stems...")
 
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
         output_dir.mkdir(parents=True, exist_ok=True)
         stem_names = self.model.sources
-        output_files = []
-
         input_stem = input_file.stem
-
-        for idx, stem_name in enumerate(stem_names):
-            progress = 80 + int((idx / len(stem_names)) * 15)
-            write_progress(progress, f"Saving {stem_name}...")
-
-            output_path = output_dir / f"{input_stem}_{stem_name}.wav"
-
-            # Get the stem audio
-            stem_audio = sources[idx]
-
-            # Save as WAV
-            _torchaudio.save(
-                str(output_path),
-                stem_audio.cpu(),
-                sr,
-                encoding="PCM_S",
-                bits_per_sample=16
-            )
-
-            output_files.append({
-                "stem": stem_name,
-                "path": str(output_path)
-            })
-
-            write_log(f"Saved: {output_path}")
-
-        return output_files
+        output_paths = [output_dir / f"{input_stem}_{stem_name}.wav" for stem_name in stem_names]
+
+        # One device-to-host copy for all stems instead of one per stem
+        stems = sources.cpu().numpy()
+
+        def save_stem(idx: int) -> None:
+            # 16-bit PCM WAV, channels last
+            pcm = _np.clip(stems[idx].T * 32767, -32768, 32767).astype(_np.int16)
+            _soundfile.write(str(output_paths[idx]), pcm, sr, subtype='PCM_16')
+
+        # Encoding and disk writes release the GIL, so stems are saved concurrently
+        with ThreadPoolExecutor(max_workers=len(stem_names)) as pool:
+            futures = {pool.submit(save_stem, idx): idx for idx in range(len(stem_names))}
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                idx = futures[future]
+                write_progress(80 + int((done / len(stem_names)) * 15), f"Saved {stem_names[idx]}")
+                write_log(f"Saved: {output_paths[idx]}")
+
+        return [
+            {"stem": stem_name, "path": str(output_path)}
+            for stem_name, output_path in zip(stem_names, output_paths)
+        ]
 
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         input_file = Path(input_data["input_file"])
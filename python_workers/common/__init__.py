@@ -1,5 +1,5 @@
 # Common utilities for Python workers
-from .worker_base import WorkerBase, run_worker
-from .json_io import read_input, write_output, write_progress, write_error, write_log
+from .worker_base import WorkerBase, run_worker, serve_pool
+from .json_io import parse_json, read_input, read_jobs, flush_output, write_output, write_progress, write_error, write_log
 
-__all__ = ['WorkerBase', 'run_worker', 'read_input', 'write_output', 'write_progress', 'write_error', 'write_log']
+__all__ = ['WorkerBase', 'run_worker', 'serve_pool', 'parse_json', 'read_input', 'read_jobs', 'flush_output', 'write_output', 'write_progress', 'write_error', 'write_log']
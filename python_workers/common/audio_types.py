@@ -59,6 +59,9 @@ class ModelConfig:
     confidence_threshold: float = 0.7
     min_segment_duration_ms: int = 500  # Ignore short detections
     merge_gap_ms: int = 300     # Merge segments closer than this
+    # Windows whose loudest mel bin is at or below this level (dB relative to
+    # the file's peak) skip inference and score 0; -80 only skips the floor
+    silence_threshold_db: float = -80.0
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ModelConfig':
@@ -68,7 +71,8 @@ class ModelConfig:
             hop_size_ms=data.get('hop_size_ms', 250),
             confidence_threshold=data.get('confidence_threshold', 0.7),
             min_segment_duration_ms=data.get('min_segment_duration_ms', 500),
-            merge_gap_ms=data.get('merge_gap_ms', 300)
+            merge_gap_ms=data.get('merge_gap_ms', 300),
+            silence_threshold_db=data.get('silence_threshold_db', -80.0)
         )
 
 
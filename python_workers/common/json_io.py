@@ -5,13 +5,59 @@ Handles communication with Rust via stdin/stdout.
 import json
 import sys
 import io
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Iterator, Union
 
-# Ensure UTF-8 encoding for stdin/stdout on Windows
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+# Ensure UTF-8 encoding for stdout on Windows (stdin is read as bytes, and
+# JSON parsers decode UTF-8 themselves). stdout stays block-buffered:
+# messages are flushed explicitly (see flush_output)
 if sys.platform == 'win32':
-    # Reconfigure stdin/stdout to use UTF-8
-    sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stdout = io.TextIOWrapper(
+        io.BufferedWriter(sys.stdout.buffer.raw, buffer_size=65536), encoding='utf-8'
+    )
+
+# Last (percent, stage) written, to drop repeated progress updates
+_last_progress = None
+
+# Serializes writes from worker threads so message lines never interleave
+_write_lock = threading.RLock()
+
+# Log levels left in the buffer until the next flush; anything else (e.g.
+# warnings, errors, or a command's streamed stdout/stderr) is flushed at once
+_BUFFERED_LOG_LEVELS = {'debug', 'info'}
+
+
+def _json_default(obj: Any) -> Any:
+    """Convert numpy scalars and arrays for the stdlib encoder."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize `obj` to a JSON string, non-ASCII text kept as UTF-8."""
+    if orjson is not None:
+        # numpy scalars/arrays and non-str (int/float/bool/None) keys, which
+        # the stdlib fallback also accepts
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, ensure_ascii=False, default=_json_default)
+
+
+def parse_json(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document; orjson's decode error subclasses json's."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _stdin_bytes():
+    """Binary stdin, or stdin itself if it has been replaced by a text stream."""
+    return getattr(sys.stdin, 'buffer', sys.stdin)
 
 
 def read_input() -> Dict[str, Any]:
@@ -20,15 +66,49 @@ def read_input() -> Dict[str, Any]:
     Returns the parsed JSON as a dictionary.
     """
     try:
-        input_data = sys.stdin.read()
+        # Parsed straight from the raw bytes, without decoding to str first
+        input_data = _stdin_bytes().read()
         if not input_data.strip():
             return {}
-        return json.loads(input_data)
+        return parse_json(input_data)
     except json.JSONDecodeError as e:
         write_error(f"Invalid JSON input: {e}")
         sys.exit(1)
 
 
+def read_jobs() -> Iterator[Dict[str, Any]]:
+    """
+    Read newline-delimited JSON jobs from stdin until EOF.
+    Lines that are not valid JSON are reported and skipped.
+    """
+    for line in _stdin_bytes():
+        if not line.strip():
+            continue
+        try:
+            yield parse_json(line)
+        except json.JSONDecodeError as e:
+            write_error(f"Invalid JSON input: {e}")
+
+
+def _write_line(line: str, flush: bool = True) -> None:
+    """Write one message line in a single write, optionally flushing."""
+    with _write_lock:
+        sys.stdout.write(line + '\n')
+        if flush:
+            sys.stdout.flush()
+
+
+def flush_output() -> None:
+    """
+    Flush buffered messages to Rust.
+
+    Results, errors, progress and log lines above info are flushed as they
+    are written; debug/info log lines are only buffered and go out with the
+    next flush (or at exit).
+    """
+    sys.stdout.flush()
+
+
 def write_output(data: Dict[str, Any]) -> None:
     """
     Write JSON output to stdout.
@@ -38,9 +118,9 @@ def write_output(data: Dict[str, Any]) -> None:
         "type": "result",
         "data": data
     }
-    json_str = json.dumps(output, ensure_ascii=False)
+    json_str = _dumps(output)
     write_log(f"Result JSON size: {len(json_str)} bytes")
-    print(json_str, flush=True)
+    _write_line(json_str)
 
 
 def write_progress(percent: int, stage: str = "") -> None:
@@ -51,13 +131,29 @@ def write_progress(percent: int, stage: str = "") -> None:
     Args:
         percent: Progress percentage (0-100)
         stage: Optional stage description (e.g., "Processing segment 3/10")
+
+    An update identical to the previous one is skipped.
     """
+    global _last_progress
+
+    percent = max(0, min(100, percent))
     output = {
         "type": "progress",
-        "percent": max(0, min(100, percent)),
+        "percent": percent,
         "stage": stage
     }
-    print(json.dumps(output, ensure_ascii=False), flush=True)
+    # Check and write under one lock so concurrent updates stay in order
+    with _write_lock:
+        if (percent, stage) == _last_progress:
+            return
+        _last_progress = (percent, stage)
+        _write_line(_dumps(output))
+
+
+def reset_progress() -> None:
+    """Forget the last progress update, so a new job's first one is always written."""
+    global _last_progress
+    _last_progress = None
 
 
 def write_error(message: str) -> None:
@@ -69,7 +165,7 @@ def write_error(message: str) -> None:
         "type": "error",
         "message": message
     }
-    print(json.dumps(output, ensure_ascii=False), flush=True)
+    _write_line(_dumps(output))
 
 
 def write_log(message: str, level: str = "info") -> None:
@@ -79,11 +175,13 @@ def write_log(message: str, level: str = "info") -> None:
 
     Args:
         message: Log message
-        level: Log level (debug, info, warning, error)
+        level: Log level (debug, info, warning, error, or stdout/stderr
+            for streamed command output)
     """
     output = {
         "type": "log",
         "level": level,
         "message": message
     }
-    print(json.dumps(output, ensure_ascii=False), flush=True)
+    # debug/info logs ride along with the next flushed message
+    _write_line(_dumps(output), flush=level not in _BUFFERED_LOG_LEVELS)
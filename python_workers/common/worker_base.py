@@ -2,12 +2,16 @@
 Base class for Python workers.
 Provides common functionality for all worker scripts.
 """
+import contextlib
+import glob
+import io
+import os
 import sys
 import traceback
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from .json_io import read_input, write_output, write_error, write_log
+from .json_io import read_input, read_jobs, reset_progress, write_output, write_error, write_log
 
 
 class WorkerBase(ABC):
@@ -19,9 +23,12 @@ class WorkerBase(ABC):
     1. Read JSON input from stdin
     2. Call process() with the input
     3. Write result to stdout (or error on failure)
+
+    `serve()` runs the same lifecycle for every line of stdin instead, so
+    state a worker caches between jobs (e.g. loaded models) is reused.
     """
 
-    _has_run = False  # Class-level flag to prevent multiple runs
+    _has_run = False  # Set per instance once run() has consumed stdin
 
     def __init__(self):
         self.input_data: Dict[str, Any] = {}
@@ -55,21 +62,28 @@ class WorkerBase(ABC):
         """
         pass
 
-    def run(self) -> int:
+    def run(self, input_override: Optional[Dict[str, Any]] = None) -> int:
         """
         Main entry point for the worker.
         Reads input, processes, and writes output.
 
+        Args:
+            input_override: Job to process instead of reading stdin, so a
+                long-lived dispatcher can hand the same worker job after job
+
         Returns:
             Exit code (0 for success, 1 for failure)
         """
-        import os
+        if input_override is not None:
+            self.input_data = input_override
+            write_log(f"Worker started with input: {list(self.input_data.keys())}")
+            return self._run_job(self.input_data)
 
-        # Prevent multiple runs in the same process
-        if WorkerBase._has_run:
+        # stdin holds a single job, so it is only read once per worker
+        if self._has_run:
             write_log(f"WARNING: Worker.run() called multiple times! Ignoring.", level="warning")
             return 1
-        WorkerBase._has_run = True
+        self._has_run = True
 
         try:
             # Log process info for debugging
@@ -83,11 +97,54 @@ class WorkerBase(ABC):
             if not self.input_data:
                 write_log("WARNING: Empty input received - this may be a subprocess that shouldn't be running", level="warning")
 
+        except Exception as e:
+            write_error(f"{type(e).__name__}: {e}")
+            write_log(traceback.format_exc(), level="error")
+            return 1
+
+        return self._run_job(self.input_data)
+
+    def serve(self) -> int:
+        """
+        Process newline-delimited JSON jobs from stdin until EOF.
+
+        Each job produces the same output as a single `run()`: logs and
+        progress followed by one result or error line.
+
+        Returns:
+            Exit code (0 once stdin is closed)
+        """
+        write_log(f"Worker PID: {os.getpid()}, serving jobs from stdin")
+
+        for input_data in read_jobs():
+            self.input_data = input_data
+            write_log(f"Worker started with input: {list(input_data.keys())}")
+            self._run_job(input_data)
+
+        return 0
+
+    def job_cost(self, input_data: Dict[str, Any]) -> float:
+        """
+        Relative cost of a job, used by `serve_pool` to start the largest
+        jobs first. Defaults to the size of the job's input file.
+        """
+        input_file = input_data.get('input_file')
+        try:
+            return float(os.path.getsize(input_file)) if input_file else 0.0
+        except OSError:
+            return 0.0
+
+    def _run_job(self, input_data: Dict[str, Any]) -> int:
+        """Validate and process one job, writing its result or error."""
+        # Progress dedup state is per job: a served job may start at the same
+        # (percent, stage) the previous one ended on
+        reset_progress()
+        try:
             # Validate input
-            self.validate_input(self.input_data)
+            self.validate_input(input_data)
 
             # Process the job
-            result = self.process(self.input_data)
+            result = self.process(input_data)
 
             # Write result to stdout
             write_output(result)
@@ -105,6 +162,101 @@ class WorkerBase(ABC):
             return 1
 
 
+# The worker instance owned by a serve_pool() process
+_pool_worker: Optional[WorkerBase] = None
+
+
+def _cpu_sets(num_procs: int) -> List[List[int]]:
+    """
+    Split the CPUs this process may run on into `num_procs` groups of
+    neighbouring CPUs, keeping each NUMA node's CPUs together (Linux).
+    """
+    allowed = os.sched_getaffinity(0)
+
+    # Order CPUs node by node so a contiguous group rarely spans two nodes
+    ordered: List[int] = []
+    for cpulist in sorted(glob.glob('/sys/devices/system/node/node[0-9]*/cpulist')):
+        with open(cpulist) as f:
+            for part in f.read().strip().split(','):
+                if not part:
+                    continue
+                first, _, last = part.partition('-')
+                ordered.extend(
+                    cpu for cpu in range(int(first), int(last or first) + 1)
+                    if cpu in allowed and cpu not in ordered
+                )
+    ordered.extend(sorted(allowed - set(ordered)))
+
+    sets = []
+    for rank in range(num_procs):
+        group = ordered[rank * len(ordered) // num_procs:(rank + 1) * len(ordered) // num_procs]
+        # More processes than CPUs: share them round-robin
+        sets.append(group or [ordered[rank % len(ordered)]])
+    return sets
+
+
+def _init_pool_worker(worker_class: type, cpu_sets) -> None:
+    """Pin this pool process to its CPU group and build its worker."""
+    global _pool_worker
+    if cpu_sets is not None:
+        os.sched_setaffinity(0, cpu_sets.get())
+    _pool_worker = worker_class()
+
+
+def _run_pool_job(input_data: Dict[str, Any]) -> str:
+    """Run one job in a pool process and return its output lines."""
+    # _run_job resets the progress dedup state of this process per job
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        write_log(f"Worker PID: {os.getpid()}, started with input: {list(input_data.keys())}")
+        _pool_worker._run_job(input_data)
+    return output.getvalue()
+
+
+def serve_pool(worker_class: type, num_procs: int) -> int:
+    """
+    Process all newline-delimited JSON jobs from stdin with `num_procs`
+    worker processes.
+
+    Each process builds one worker, so anything it caches (e.g. loaded
+    models) is reused for every job it takes, and on Linux it is pinned to
+    its own group of CPUs so processes don't contend for cores. Jobs are
+    started largest first (`job_cost`) so short ones fill in at the end. A
+    job's output is buffered in its process and written in one piece when
+    it finishes, so lines from concurrent jobs never interleave.
+
+    Returns:
+        Exit code (0 once every job has finished)
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    jobs = sorted(read_jobs(), key=worker_class().job_cost, reverse=True)
+    write_log(f"Worker PID: {os.getpid()}, serving {len(jobs)} jobs with {num_procs} processes")
+
+    cpu_sets = None
+    if hasattr(os, 'sched_setaffinity'):
+        cpu_sets = multiprocessing.SimpleQueue()
+        for cpus in _cpu_sets(num_procs):
+            cpu_sets.put(cpus)
+
+    with ProcessPoolExecutor(
+        max_workers=num_procs, initializer=_init_pool_worker, initargs=(worker_class, cpu_sets)
+    ) as pool:
+        futures = [pool.submit(_run_pool_job, job) for job in jobs]
+        for future in as_completed(futures):
+            try:
+                output = future.result()
+            except Exception as e:
+                # The worker process itself died; its job gets an error line
+                write_error(f"{type(e).__name__}: {e}")
+                continue
+            sys.stdout.write(output)
+            sys.stdout.flush()
+
+    return 0
+
+
 def run_worker(worker_class: type) -> None:
     """
     Convenience function to create and run a worker.
@@ -2,15 +2,24 @@
 Gacha History Worker for HoYoverse games.
 Extracts auth URL from web cache and fetches gacha records from API.
 """
+import hashlib
+import json
+import mmap
+import operator
 import os
+import queue
+import random
 import re
+import sys
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse, parse_qs, urlencode
 import requests
+from urllib3.util.retry import Retry
 
 from common.worker_base import WorkerBase, run_worker
-from common.json_io import write_log, write_progress
+from common.json_io import parse_json, write_log, write_progress
 
 
 # Game configurations
@@ -35,6 +44,70 @@ GAME_CONFIGS = {
     },
 }
 
+# Web cache folders of older clients that put a version directory under webCaches
+KNOWN_CACHE_VERSIONS = ["2.24.0.0", "2.25.0.0", "2.26.0.0"]
+VERSION_DIR_RE = re.compile(r"^\d+(\.\d+)+$")
+
+# Compile each game's auth URL pattern and derive its fallback cache
+# locations (relative to the game folder) once at import
+for _config in GAME_CONFIGS.values():
+    _config["url_pattern_re"] = re.compile(_config["url_pattern"])
+    _config["alternate_cache_paths"] = [
+        _config["cache_path"].replace("webCaches", f"webCaches/{version}")
+        for version in KNOWN_CACHE_VERSIONS
+    ]
+    _config["base_cache_dir"] = os.path.dirname(_config["cache_path"]).replace("Cache/Cache_Data", "")
+
+# Shared HTTP session: keep-alive connections (and TLS sessions) are reused
+# across pages and banners; the pool has room for one connection per
+# concurrently fetched banner. Connection errors, 429 and 5xx replies
+# are retried with exponential backoff (1s, 2s, 4s), honouring Retry-After
+_http = requests.Session()
+_http.mount("https://", requests.adapters.HTTPAdapter(
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    ),
+))
+
+# API retcodes: expired auth key (fatal) and "visit too frequently" (retried)
+RETCODE_AUTHKEY_EXPIRED = -101
+RETCODE_TOO_FREQUENT = -110
+RATE_LIMIT_RETRIES = 3
+
+# Minimum spacing between page requests of one banner; the API throttles
+# (-110) clients that page faster than this
+PAGE_INTERVAL = 0.3
+
+# Banners fetched at the same time
+MAX_CONCURRENT_BANNERS = 2
+
+def _user_data_dir() -> str:
+    """Per-user data directory, as the app's dirs::data_dir() resolves it."""
+    if sys.platform == "win32":
+        return os.environ.get("APPDATA") or os.path.expanduser("~")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support")
+    return os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+
+
+# Pages older than a known record id never change, so they are kept on
+# disk and re-syncs only download the newest page(s) of each banner. They
+# hold account data, so they live in the app's per-user data directory,
+# readable by the user only
+PAGE_CACHE_DIR = os.path.join(_user_data_dir(), "Atlas", "cache", "gacha_pages")
+
+# Oldest pages are evicted once the cache grows past this
+PAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+# Fields copied from each API item into a record, in output order
+RECORD_FIELDS = ("id", "uid", "gacha_type", "item_id", "name", "item_type", "rank_type", "time")
+_record_values = operator.itemgetter(*RECORD_FIELDS)
+
 
 class GachaHistoryWorker(WorkerBase):
     """Worker for extracting gacha history from HoYoverse games."""
@@ -74,28 +147,49 @@ class GachaHistoryWorker(WorkerBase):
 
         write_progress(20, "Fetching gacha records...")
 
-        # Step 3: Fetch records from API
+        # Step 3: Fetch records from API. Banners are independent, so a few are
+        # fetched concurrently; each paginates in order at PAGE_INTERVAL pacing.
+        # More parallel banners than MAX_CONCURRENT_BANNERS trips the API's
+        # -110 throttling
         all_records = []
         uid = None
         region = None
 
         gacha_types = config["gacha_types"]
-        for i, gacha_type in enumerate(gacha_types):
-            progress_base = 20 + (i * 70 // len(gacha_types))
-            progress_end = 20 + ((i + 1) * 70 // len(gacha_types))
-
-            write_progress(progress_base, f"Fetching banner type {gacha_type}...")
-
-            records, fetched_uid, fetched_region = self.fetch_gacha_records(
-                config["api_endpoint"],
-                auth_params,
-                gacha_type,
-                last_id,
-                lambda p: write_progress(
-                    progress_base + int(p * (progress_end - progress_base) / 100),
-                    f"Fetching banner type {gacha_type}..."
+        # Fetch threads report (banner index, percent); only this thread writes
+        progress_updates: queue.Queue = queue.Queue()
+        banner_progress = [0] * len(gacha_types)
+
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_BANNERS, len(gacha_types))) as pool:
+            futures = [
+                pool.submit(
+                    self.fetch_gacha_records,
+                    config["api_endpoint"],
+                    auth_params,
+                    gacha_type,
+                    last_id,
+                    lambda p, i=i: progress_updates.put((i, p))
                 )
-            )
+                for i, gacha_type in enumerate(gacha_types)
+            ]
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                while not progress_updates.empty():
+                    i, p = progress_updates.get_nowait()
+                    banner_progress[i] = p
+                for future in done:
+                    banner_progress[futures.index(future)] = 100
+
+                write_progress(
+                    20 + sum(banner_progress) * 70 // (100 * len(gacha_types)),
+                    f"Fetching banners ({len(gacha_types) - len(pending)}/{len(gacha_types)} done)..."
+                )
+
+        # Combine in banner order, as the sequential fetch did
+        for future in futures:
+            records, fetched_uid, fetched_region = future.result()
 
             all_records.extend(records)
 
@@ -110,6 +204,7 @@ class GachaHistoryWorker(WorkerBase):
             uid = all_records[0].get("uid", "unknown")
 
         write_log(f"Fetched {len(all_records)} records for UID {uid}")
+        self._prune_page_cache()
         write_progress(100, "Complete")
 
         return {
@@ -120,32 +215,29 @@ class GachaHistoryWorker(WorkerBase):
 
     def extract_auth_url(self, game_path: str, config: Dict) -> Optional[str]:
         """Extract auth URL from game's web cache."""
-        import os
-
         cache_path = os.path.join(game_path, config["cache_path"])
 
         write_log(f"Looking for cache at: {cache_path}")
 
         if not os.path.exists(cache_path):
             # Try alternate cache locations
-            alternate_paths = [
-                cache_path,
-                cache_path.replace("webCaches", "webCaches/2.24.0.0"),
-                cache_path.replace("webCaches", "webCaches/2.25.0.0"),
-                cache_path.replace("webCaches", "webCaches/2.26.0.0"),
-            ]
-
-            for alt_path in alternate_paths:
+            for alt_path in config["alternate_cache_paths"]:
+                alt_path = os.path.join(game_path, alt_path)
                 if os.path.exists(alt_path):
                     cache_path = alt_path
                     break
             else:
                 # Search for any version - sort by version number descending to get newest first
-                base_cache_dir = os.path.join(game_path, os.path.dirname(config["cache_path"]).replace("Cache/Cache_Data", ""))
+                base_cache_dir = os.path.join(game_path, config["base_cache_dir"])
                 if os.path.exists(base_cache_dir):
-                    version_dirs = [d for d in os.listdir(base_cache_dir) if os.path.isdir(os.path.join(base_cache_dir, d))]
+                    # scandir reports the entry type without a stat per entry
+                    with os.scandir(base_cache_dir) as entries:
+                        version_dirs = [
+                            entry.name for entry in entries
+                            if entry.is_dir() and VERSION_DIR_RE.match(entry.name)
+                        ]
                     # Sort by version number (e.g., "2.44.0.0" > "2.40.0.0")
-                    version_dirs.sort(key=lambda v: [int(x) for x in v.split('.') if x.isdigit()], reverse=True)
+                    version_dirs.sort(key=lambda v: tuple(map(int, v.split('.'))), reverse=True)
                     for version_dir in version_dirs:
                         potential_path = os.path.join(base_cache_dir, version_dir, "Cache/Cache_Data/data_2")
                         if os.path.exists(potential_path):
@@ -159,21 +251,23 @@ class GachaHistoryWorker(WorkerBase):
         write_log(f"Reading cache from: {cache_path}")
 
         try:
-            with open(cache_path, "rb") as f:
-                content = f.read()
-
-            # Search for auth URL using pattern
-            pattern = config["url_pattern"]
-            matches = re.findall(pattern, content)
-
-            if not matches:
+            url_bytes = None
+            # mmap can't map an empty file (and there is nothing to find in one)
+            if os.path.getsize(cache_path) > 0:
+                # Scan the cache in place through a read-only mapping instead of
+                # copying the whole file into memory first
+                with open(cache_path, "rb") as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    # Search for auth URL using pattern, keeping only the last
+                    # (most recent) match rather than building a list of all of them
+                    for match in config["url_pattern_re"].finditer(content):
+                        url_bytes = match.group(0)
+
+            if url_bytes is None:
                 write_log("No auth URL found in cache", level="warning")
                 return None
 
-            # Get the last (most recent) match and decode it
-            url_bytes = matches[-1]
-
-            # Clean up the URL - remove any trailing null bytes and invalid characters
+            # Decode and clean up the URL - remove any trailing null bytes and invalid characters
             url_str = url_bytes.decode("utf-8", errors="ignore")
             url_str = url_str.split("\x00")[0]  # Stop at first null byte
             url_str = url_str.strip()
@@ -226,12 +320,30 @@ class GachaHistoryWorker(WorkerBase):
         page = 0
         max_pages = 100  # Safety limit
 
+        # Encode the auth params (mostly the long authkey) once; only the
+        # paging params change from page to page
+        paging_keys = ("gacha_type", "page", "size", "end_id")
+        auth_query = urlencode({k: v for k, v in auth_params.items() if k not in paging_keys})
+
+        # Values for fields an API item may omit
+        record_defaults = {
+            "id": "",
+            "uid": "",
+            "gacha_type": gacha_type,
+            "item_id": None,
+            "name": "",
+            "item_type": "",
+            "rank_type": "3",
+            "time": "",
+        }
+
+        last_request = 0.0
+
         while page < max_pages:
             page += 1
 
             # Build request params
             params = {
-                **auth_params,
                 "gacha_type": gacha_type,
                 "page": str(page),
                 "size": "20",
@@ -239,15 +351,28 @@ class GachaHistoryWorker(WorkerBase):
             }
 
             try:
-                url = f"{endpoint}?{urlencode(params)}"
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-
-                data = response.json()
+                # The first page (end_id 0) gains new pulls, so it is always
+                # fetched; it also yields the uid that scopes the cache key
+                cache_key = None
+                if end_id != "0" and uid:
+                    cache_key = (endpoint, uid, gacha_type, auth_params.get("lang", ""), end_id)
+
+                data = self._read_cached_page(cache_key) if cache_key else None
+                if data is None:
+                    # Cached pages are free; only network requests are paced
+                    wait_time = last_request + PAGE_INTERVAL - time.monotonic()
+                    if wait_time > 0:
+                        time.sleep(wait_time)
+                    last_request = time.monotonic()
+
+                    url = f"{endpoint}?{auth_query}&{urlencode(params)}"
+                    data = self._get_page(url)
+                    if cache_key and data.get("retcode") == 0 and data.get("data", {}).get("list"):
+                        self._write_cached_page(cache_key, data)
 
                 if data.get("retcode") != 0:
                     error_msg = data.get("message", "Unknown API error")
-                    if data.get("retcode") == -101:
+                    if data.get("retcode") == RETCODE_AUTHKEY_EXPIRED:
                         raise ValueError("Auth key expired. Please re-open the wish/warp history in-game.")
                     write_log(f"API error: {error_msg} (code: {data.get('retcode')})", level="error")
                     break
@@ -262,40 +387,46 @@ class GachaHistoryWorker(WorkerBase):
                 if not region and result_data.get("region"):
                     region = result_data["region"]
 
+                # Pages are newest first, so once the oldest item on a page is
+                # one we already have, only a leading run of the page is new:
+                # binary-search where it ends and stop after it
+                reached_last_id = bool(last_id) and items[-1].get("id", "") <= last_id
+                if reached_last_id:
+                    lo, hi = 0, len(items)
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if items[mid].get("id", "") <= last_id:
+                            hi = mid
+                        else:
+                            lo = mid + 1
+                    items = items[:lo]
+
                 for item in items:
-                    record_id = item.get("id", "")
-
-                    # Stop if we've reached records we already have
-                    if last_id and record_id <= last_id:
-                        return records, uid, region
-
-                    record = {
-                        "id": record_id,
-                        "uid": item.get("uid", ""),
-                        "gacha_type": item.get("gacha_type", gacha_type),
-                        "item_id": item.get("item_id"),
-                        "name": item.get("name", ""),
-                        "item_type": item.get("item_type", ""),
-                        "rank_type": item.get("rank_type", "3"),
-                        "time": item.get("time", ""),
-                    }
+                    # Fill in omitted fields on the (already cached) item itself,
+                    # then pull all fields in one C-level lookup
+                    for field, default in record_defaults.items():
+                        item.setdefault(field, default)
+                    record = dict(zip(RECORD_FIELDS, _record_values(item)))
                     records.append(record)
 
                     if not uid and record["uid"]:
                         uid = record["uid"]
 
+                # Stop if we've reached records we already have
+                if reached_last_id:
+                    return records, uid, region
+
                 # Update end_id for next page
                 end_id = items[-1].get("id", "0")
 
                 # Progress update
                 progress_callback(min(100, page * 10))
 
-                # Rate limiting - be nice to the API
-                time.sleep(0.3)
-
             except requests.RequestException as e:
+                # Stopping here would report a truncated history as complete,
+                # and later syncs (which stop at last_id) would never fill the gap
                 write_log(f"Request error: {e}", level="error")
-                break
+                raise
             except ValueError:
                 raise
             except Exception as e:
@@ -304,6 +435,80 @@ class GachaHistoryWorker(WorkerBase):
 
         return records, uid, region
 
+    def _get_page(self, url: str) -> Dict[str, Any]:
+        """
+        GET one page of records and return the decoded JSON.
+
+        Transient HTTP failures are retried by the session's adapter. The API
+        reports throttling in the body instead ("visit too frequently"), so
+        that reply is retried here with jittered exponential backoff. If it
+        persists, the fetch fails rather than returning a partial history.
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            response = _http.get(url, timeout=30)
+            response.raise_for_status()
+            # Parsed from the raw body with orjson when available. A bad body is
+            # a request failure (as with response.json()), not a fatal ValueError
+            try:
+                data = parse_json(response.content)
+            except ValueError as e:
+                raise requests.exceptions.InvalidJSONError(f"Invalid JSON response: {e}", response=response) from e
+
+            if data.get("retcode") != RETCODE_TOO_FREQUENT:
+                return data
+            if attempt == RATE_LIMIT_RETRIES:
+                raise ValueError(
+                    f"API rate limit persisted after {RATE_LIMIT_RETRIES} retries. Please try again in a minute."
+                )
+
+            delay = min(30.0, 0.5 * 2 ** attempt * (1 + random.random() * 0.5))
+            write_log(f"API rate limit hit, retrying in {delay:.1f}s", level="warning")
+            time.sleep(delay)
+
+    @staticmethod
+    def _page_cache_path(cache_key: tuple) -> str:
+        digest = hashlib.sha1("|".join(cache_key).encode("utf-8")).hexdigest()
+        return os.path.join(PAGE_CACHE_DIR, f"{digest}.json")
+
+    def _read_cached_page(self, cache_key: tuple) -> Optional[Dict[str, Any]]:
+        """Return a previously fetched page, or None if it isn't cached."""
+        try:
+            with open(self._page_cache_path(cache_key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cached_page(self, cache_key: tuple, data: Dict[str, Any]) -> None:
+        """Store a page; the cache is best-effort, so failures are only logged."""
+        path = self._page_cache_path(cache_key)
+        try:
+            os.makedirs(PAGE_CACHE_DIR, mode=0o700, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            write_log(f"Could not cache page: {e}", level="warning")
+
+    def _prune_page_cache(self) -> None:
+        """Delete the least recently written pages while the cache exceeds its size cap."""
+        try:
+            entries = [entry for entry in os.scandir(PAGE_CACHE_DIR) if entry.is_file()]
+        except OSError:
+            return
+
+        stats = {entry.path: entry.stat() for entry in entries}
+        total = sum(stat.st_size for stat in stats.values())
+        for path in sorted(stats, key=lambda p: stats[p].st_mtime):
+            if total <= PAGE_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+                total -= stats[path].st_size
+            except OSError:
+                pass
+
 
 if __name__ == "__main__":
     run_worker(GachaHistoryWorker)
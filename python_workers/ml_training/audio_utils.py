@@ -2,7 +2,6 @@
 Audio loading and preprocessing utilities for the ML training pipeline.
 """
 import numpy as np
-import librosa
 from pathlib import Path
 from typing import Optional, Tuple, List
 import sys
@@ -21,6 +20,7 @@ def preprocess_audio(
     trim_silence: bool = False,
     trim_db: float = 30.0
 ) -> np.ndarray:
+    import librosa
     audio, _ = librosa.load(file_path, sr=sr, mono=mono)
 
     # Trim silence if requested
@@ -39,22 +39,44 @@ def segment_audio(
     hop_size_samples: int = SAMPLE_RATE // 4  
 ) -> List[np.ndarray]:
 
-    windows = []
-    audio_length = len(audio)
+    # One window per hop start, as with range(0, len(audio), hop); windows
+    # running past the end are zero-padded, so pad once and gather strided
+    # views instead of slicing and padding each window. The views overlap and
+    # are read-only, so they are copied into one array of independent,
+    # writable rows
+    num_windows = -(-len(audio) // hop_size_samples)
+    if num_windows == 0:
+        return []
 
-    for start in range(0, audio_length, hop_size_samples):
-        end = start + window_size_samples
-        window = audio[start:end]
+    padded_length = (num_windows - 1) * hop_size_samples + window_size_samples
+    if padded_length > len(audio):
+        audio = np.pad(audio, (0, padded_length - len(audio)))
 
-        if len(window) < window_size_samples:
-            window = np.pad(window, (0, window_size_samples - len(window)))
+    windows = np.lib.stride_tricks.sliding_window_view(
+        audio[:padded_length], window_size_samples
+    )[::hop_size_samples].copy()
+    return list(windows)
 
-        windows.append(window)
 
-    return windows
+def get_audio_duration(file_path: str) -> float:
+    # Read the duration from the file header where possible: soundfile covers
+    # WAV/FLAC/OGG, PyAV's container probe covers MP3/M4A/AAC/WMA/OPUS
+    import soundfile
+    try:
+        info = soundfile.info(file_path)
+        return info.frames / info.samplerate
+    except Exception:
+        pass
 
+    try:
+        import av
+        with av.open(file_path) as container:
+            if container.duration is not None:
+                return container.duration / av.time_base
+    except Exception:
+        pass
 
-def get_audio_duration(file_path: str) -> float:
+    import librosa
     return librosa.get_duration(path=file_path)
 
 
@@ -65,7 +87,7 @@ def load_audio_segment(
     sr: int = SAMPLE_RATE,
     normalize: bool = False  
 ) -> np.ndarray:
-   
+    import librosa
     audio, _ = librosa.load(
         file_path,
         sr=sr,
@@ -110,19 +132,17 @@ def split_audio_by_timestamps(
     sr: int = SAMPLE_RATE
 ) -> List[np.ndarray]:
     
-    segments = []
-    for start_sec, end_sec in timestamps:
-        start_sample = int(start_sec * sr)
-        end_sample = int(end_sec * sr)
-        segment = audio[start_sample:end_sample]
-        segments.append(segment)
-    return segments
+    # Convert all bounds to sample offsets at once (float64 and truncation,
+    # as int(sec * sr) did); the segments are views into `audio`
+    bounds = (np.asarray(timestamps, dtype=np.float64).reshape(-1, 2) * sr).astype(np.int64)
+    return [audio[start:end] for start, end in bounds.tolist()]
 
 
 def calculate_rms_energy(audio: np.ndarray, frame_length: int = 2048) -> float:
    
-    # Fast numpy RMS
-    return float(np.sqrt(np.mean(audio ** 2)))
+    # Fast numpy RMS: dot() squares and sums in one pass, no temporary array
+    samples = audio.ravel()
+    return float(np.sqrt(np.dot(samples, samples) / samples.size))
 
 
 def has_sufficient_energy(
@@ -0,0 +1,102 @@
+"""
+Convert an exported ONNX model to FP16 for GPU inference.
+
+The converted model takes and returns float16 tensors; the audio detector
+detects this from the model input type and feeds half-precision batches.
+
+Usage:
+    python python_workers/ml_training/convert_fp16.py <model.onnx> [output_path.onnx]
+
+Example:
+    python python_workers/ml_training/convert_fp16.py "D:/Tools/training_data/output/audio_event_detector.onnx"
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+def convert_to_fp16(onnx_path: str, output_path: str, log_fn=None) -> None:
+    """
+    Convert all float32 weights and I/O of an ONNX model to float16.
+
+    Args:
+        onnx_path: Path to the float32 ONNX model
+        output_path: Path to save the float16 model
+        log_fn: Optional logging function (default: print)
+    """
+    import onnx
+    from onnxconverter_common.float16 import convert_float_to_float16
+
+    if log_fn is None:
+        log_fn = print  # Default for CLI
+
+    model = onnx.load(onnx_path)
+    model_fp16 = convert_float_to_float16(model, keep_io_types=False)
+    onnx.save(model_fp16, output_path)
+
+    log_fn(f"FP16 model saved to: {output_path}")
+
+
+def verify_fp16_model(onnx_path: str, fp16_path: str, log_fn=None) -> bool:
+    """
+    Check that the FP16 model's probabilities stay close to the original's.
+
+    Returns:
+        True if outputs match within FP16 tolerance
+    """
+    import onnxruntime as ort
+
+    if log_fn is None:
+        log_fn = print  # Default for CLI
+
+    test_input = np.random.randn(8, 1, 128, 32).astype(np.float32)
+
+    fp32_session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    fp16_session = ort.InferenceSession(fp16_path, providers=['CPUExecutionProvider'])
+    fp32_output = fp32_session.run(None, {'mel_spectrogram': test_input})[0]
+    fp16_output = fp16_session.run(None, {'mel_spectrogram': test_input.astype(np.float16)})[0]
+
+    max_diff = np.max(np.abs(fp32_output - fp16_output.astype(np.float32)))
+    is_close = max_diff < 1e-2
+
+    if is_close:
+        log_fn(f"FP16 verification passed (max diff: {max_diff:.2e})")
+    else:
+        log_fn(f"FP16 verification FAILED (max diff: {max_diff:.2e})")
+
+    return is_close
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert ONNX model to FP16")
+    parser.add_argument(
+        'model',
+        help='Path to the float32 .onnx model'
+    )
+    parser.add_argument(
+        'output',
+        nargs='?',
+        default=None,
+        help='Output ONNX path (default: <model>.fp16.onnx next to the original)'
+    )
+    args = parser.parse_args()
+
+    model_path = Path(args.model)
+    if not model_path.exists():
+        print(f"Error: Model not found: {model_path}")
+        sys.exit(1)
+
+    output_path = Path(args.output) if args.output else model_path.with_suffix('.fp16.onnx')
+
+    print(f"Converting {model_path} to FP16...")
+    convert_to_fp16(str(model_path), str(output_path))
+
+    print("\nVerifying FP16 model...")
+    if not verify_fp16_model(str(model_path), str(output_path)):
+        print("\nWarning: FP16 outputs differ noticeably from the original model.")
+
+
+if __name__ == '__main__':
+    main()
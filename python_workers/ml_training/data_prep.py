@@ -1,23 +1,46 @@
 import json
+import os
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 import sys
 import argparse
 from tqdm import tqdm
 import random
+from concurrent.futures import ProcessPoolExecutor
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from common.audio_types import (
     TrainingManifest, TrainingSample, SAMPLE_RATE
 )
+from common.json_io import parse_json
 from ml_training.audio_utils import (
     preprocess_audio, is_valid_audio_file, calculate_rms_energy
 )
 from ml_training.feature_extraction import extract_windows_from_full_spectrogram
 
 
+# Windows of one split/class are stored together as a single [N, n_mels, frames]
+# .npy file with this suffix, which the training Dataset memory-maps
+SHARD_SUFFIX = '.windows.npy'
+
+# Stored precision of the normalized windows; the Dataset computes in float32
+WINDOW_DTYPE = np.float16
+
+# Time frames per window the model expects
+TARGET_FRAMES = 32
+
+
+def load_manifest(manifest_path: str) -> TrainingManifest:
+
+    # Manifests can list many thousands of files; parsed from the raw bytes
+    # (with orjson when available)
+    with open(manifest_path, 'rb') as f:
+        manifest_dict = parse_json(f.read())
+    return TrainingManifest.from_dict(manifest_dict)
+
+
 def create_training_dataset(
     manifest_path: str,
     output_dir: str,
@@ -25,16 +48,16 @@ def create_training_dataset(
     hop_size_ms: int = 250,
     val_split: float = 0.2,
     min_energy: float = 0.01,
-    seed: int = 42
+    seed: int = 42,
+    min_window_energy: Optional[float] = None,
+    validated_files: Optional[Set[str]] = None
 ) -> Dict:
     
     random.seed(seed)
     np.random.seed(seed)
 
     # Load manifest
-    with open(manifest_path, 'r') as f:
-        manifest_dict = json.load(f)
-    manifest = TrainingManifest.from_dict(manifest_dict)
+    manifest = load_manifest(manifest_path)
 
     # Create output directories
     output_path = Path(output_dir)
@@ -57,6 +80,10 @@ def create_training_dataset(
         'hard_negative': {'total_windows': 0, 'train': 0, 'val': 0, 'files': 0}
     }
 
+    # Windows per file, shared by the three passes below (hard negatives often
+    # come from the same recordings as other samples)
+    window_cache: Dict[str, List[np.ndarray]] = {}
+
     # Process positive samples
     print("Processing positive samples...")
     pos_windows = process_samples(
@@ -64,7 +91,10 @@ def create_training_dataset(
         label=1,
         window_samples=window_samples,
         hop_samples=hop_samples,
-        min_energy=min_energy
+        min_energy=min_energy,
+        min_window_energy=min_window_energy,
+        validated_files=validated_files,
+        window_cache=window_cache
     )
     stats['positive']['total_windows'] = len(pos_windows)
     stats['positive']['files'] = len(manifest.positive_samples)
@@ -76,7 +106,10 @@ def create_training_dataset(
         label=0,
         window_samples=window_samples,
         hop_samples=hop_samples,
-        min_energy=min_energy
+        min_energy=min_energy,
+        min_window_energy=min_window_energy,
+        validated_files=validated_files,
+        window_cache=window_cache
     )
     stats['negative']['total_windows'] = len(neg_windows)
     stats['negative']['files'] = len(manifest.negative_samples)
@@ -88,7 +121,10 @@ def create_training_dataset(
         label=0,
         window_samples=window_samples,
         hop_samples=hop_samples,
-        min_energy=min_energy
+        min_energy=min_energy,
+        min_window_energy=min_window_energy,
+        validated_files=validated_files,
+        window_cache=window_cache
     )
     stats['hard_negative']['total_windows'] = len(hard_neg_windows)
     stats['hard_negative']['files'] = len(manifest.hard_negative_samples)
@@ -96,18 +132,19 @@ def create_training_dataset(
     # Combine all negatives
     all_neg_windows = neg_windows + hard_neg_windows
 
-    # Split into train/val
-    random.shuffle(pos_windows)
-    random.shuffle(all_neg_windows)
+    # Split into train/val: shuffle index arrays in NumPy (seeded above) and
+    # pick windows by index rather than shuffling the window lists themselves
+    pos_order = np.random.permutation(len(pos_windows)).tolist()
+    neg_order = np.random.permutation(len(all_neg_windows)).tolist()
 
     pos_val_size = int(len(pos_windows) * val_split)
     neg_val_size = int(len(all_neg_windows) * val_split)
 
-    train_positive = pos_windows[pos_val_size:]
-    val_positive = pos_windows[:pos_val_size]
+    train_positive = [pos_windows[i] for i in pos_order[pos_val_size:]]
+    val_positive = [pos_windows[i] for i in pos_order[:pos_val_size]]
 
-    train_negative = all_neg_windows[neg_val_size:]
-    val_negative = all_neg_windows[:neg_val_size]
+    train_negative = [all_neg_windows[i] for i in neg_order[neg_val_size:]]
+    val_negative = [all_neg_windows[i] for i in neg_order[:neg_val_size]]
 
     # Save samples
     print("Saving training samples...")
@@ -131,6 +168,7 @@ def create_training_dataset(
         'sample_rate': SAMPLE_RATE,
         'val_split': val_split,
         'min_energy': min_energy,
+        'min_window_energy': min_window_energy,
         'seed': seed,
         'stats': stats,
         'train': {
@@ -161,42 +199,76 @@ def process_samples(
     label: int,
     window_samples: int,
     hop_samples: int,
-    min_energy: float
+    min_energy: float,
+    min_window_energy: Optional[float] = None,
+    num_workers: Optional[int] = None,
+    validated_files: Optional[Set[str]] = None,
+    window_cache: Optional[Dict[str, List[np.ndarray]]] = None
 ) -> List[Tuple[np.ndarray, int]]:
    
     windows = []
+    num_workers = num_workers or os.cpu_count() or 1
+    # Files validate_manifest() already probed are not probed again
+    validated_files = validated_files or set()
+    # Windows don't depend on the label, so a file listed more than once (here
+    # or in another call sharing the cache) is decoded and windowed only once
+    window_cache = window_cache if window_cache is not None else {}
+    pending_files = list(dict.fromkeys(
+        sample.file for sample in samples if sample.file not in window_cache
+    ))
+    jobs = [
+        (file_path, window_samples, hop_samples, min_energy, min_window_energy, file_path in validated_files)
+        for file_path in pending_files
+    ]
+    desc = f"Processing {'positive' if label == 1 else 'negative'} samples"
+
+    # Files are independent and decoding + STFT is CPU-bound, so spread them
+    # over processes; map() keeps manifest order, so the output is unchanged
+    if num_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(jobs))) as pool:
+            results = list(tqdm(pool.map(_process_file, jobs, chunksize=4), total=len(jobs), desc=desc))
+    else:
+        results = [_process_file(job) for job in tqdm(jobs, desc=desc)]
 
-    for sample in tqdm(samples, desc=f"Processing {'positive' if label == 1 else 'negative'} samples"):
-        file_path = sample.file
+    for file_path, (mel_windows, message) in zip(pending_files, results):
+        if message:
+            print(message)
+        window_cache[file_path] = mel_windows
 
-        # Skip invalid files
-        if not is_valid_audio_file(file_path):
-            print(f"  Skipping invalid file: {file_path}")
-            continue
+    # Add all windows with the label
+    for sample in samples:
+        for mel_spec in window_cache[sample.file]:
+            windows.append((mel_spec, label))
 
-        try:
-            # Load and preprocess audio
-            audio = preprocess_audio(file_path)
+    return windows
 
-            # Quick energy check on full audio before processing
-            if calculate_rms_energy(audio) < min_energy:
-                print(f"  Skipping low-energy file: {file_path}")
-                continue
 
-            # OPTIMIZATION: Compute full spectrogram once and slice windows
-            mel_windows = extract_windows_from_full_spectrogram(
-                audio, window_samples, hop_samples
-            )
+def _process_file(
+    job: Tuple[str, int, int, float, Optional[float], bool]
+) -> Tuple[List[np.ndarray], Optional[str]]:
+    """Window one audio file; returns its mel windows and a skip/error message."""
+    file_path, window_samples, hop_samples, min_energy, min_window_energy, is_validated = job
 
-            # Add all windows with the label
-            for mel_spec in mel_windows:
-                windows.append((mel_spec, label))
+    # Skip invalid files
+    if not is_validated and not is_valid_audio_file(file_path):
+        return [], f"  Skipping invalid file: {file_path}"
 
-        except Exception as e:
-            print(f"  Error processing {file_path}: {e}")
-            continue
+    try:
+        # Load and preprocess audio
+        audio = preprocess_audio(file_path)
 
-    return windows
+        # Quick energy check on full audio before processing
+        if calculate_rms_energy(audio) < min_energy:
+            return [], f"  Skipping low-energy file: {file_path}"
+
+        # OPTIMIZATION: Compute full spectrogram once and slice windows
+        mel_windows = extract_windows_from_full_spectrogram(
+            audio, window_samples, hop_samples, min_window_energy=min_window_energy
+        )
+        return [mel_spec.astype(WINDOW_DTYPE) for mel_spec in mel_windows], None
+
+    except Exception as e:
+        return [], f"  Error processing {file_path}: {e}"
 
 
 def save_samples(
@@ -205,9 +277,59 @@ def save_samples(
     prefix: str
 ) -> None:
 
+    if not samples:
+        return
+
+    # One preallocated shard written row by row instead of a file per window
+    first_spec = samples[0][0]
+    shard = np.lib.format.open_memmap(
+        output_dir / f"{prefix}{SHARD_SUFFIX}", mode='w+',
+        dtype=first_spec.dtype, shape=(len(samples),) + first_spec.shape
+    )
     for i, (spec, label) in enumerate(tqdm(samples, desc="Saving samples")):
-        filename = f"{prefix}_{i:06d}.npy"
-        np.save(output_dir / filename, spec)
+        shard[i] = spec
+    shard.flush()
+    del shard
+
+
+def fit_frames(spec: np.ndarray, target_frames: int = TARGET_FRAMES) -> np.ndarray:
+
+    # Center-crop or zero-pad the time axis to exactly target_frames
+    num_frames = spec.shape[1]
+    if num_frames > target_frames:
+        start = (num_frames - target_frames) // 2
+        return spec[:, start:start + target_frames]
+    if num_frames < target_frames:
+        return np.pad(spec, ((0, 0), (0, target_frames - num_frames)), mode='constant')
+    return spec
+
+
+def build_shard(data_dir: str, split: str) -> int:
+
+    # Consolidate single-sample .npy files (one spectrogram per file) of a
+    # split into one window shard per class, so training memory-maps a single
+    # file instead of opening thousands. The consolidated files are removed
+    consolidated = 0
+    for class_name in ('positive', 'negative'):
+        sample_dir = Path(data_dir) / split / class_name
+        paths = [
+            path for path in sorted(sample_dir.glob('*.npy'))
+            if not path.name.endswith(SHARD_SUFFIX)
+        ]
+        if not paths:
+            continue
+
+        samples = [(fit_frames(np.load(path)).astype(WINDOW_DTYPE, copy=False), None) for path in paths]
+        prefix = 'samples'
+        while (sample_dir / f"{prefix}{SHARD_SUFFIX}").exists():
+            prefix += '_'
+        save_samples(samples, sample_dir, prefix)
+
+        for path in paths:
+            path.unlink()
+        consolidated += len(paths)
+
+    return consolidated
 
 
 def create_manifest_template(output_path: str) -> None:
@@ -233,14 +355,15 @@ def create_manifest_template(output_path: str) -> None:
     print("Edit the file to add your training data paths.")
 
 
-def validate_manifest(manifest_path: str) -> Tuple[bool, List[str]]:
+def validate_manifest(
+    manifest_path: str,
+    validated_files: Optional[Set[str]] = None
+) -> Tuple[bool, List[str]]:
 
     errors = []
 
     try:
-        with open(manifest_path, 'r') as f:
-            manifest_dict = json.load(f)
-        manifest = TrainingManifest.from_dict(manifest_dict)
+        manifest = load_manifest(manifest_path)
     except Exception as e:
         return False, [f"Failed to load manifest: {e}"]
 
@@ -256,6 +379,9 @@ def validate_manifest(manifest_path: str) -> Tuple[bool, List[str]]:
             errors.append(f"File not found: {sample.file}")
         elif not is_valid_audio_file(sample.file):
             errors.append(f"Invalid audio file: {sample.file}")
+        elif validated_files is not None:
+            # Lets create_training_dataset() skip probing this file again
+            validated_files.add(sample.file)
 
     # Check we have enough samples (relaxed for large audio files)
     if len(manifest.positive_samples) < 2:
@@ -331,6 +457,12 @@ def main():
         default=42,
         help='Random seed (default: 42)'
     )
+    prepare_parser.add_argument(
+        '--min-window-energy',
+        type=float,
+        default=None,
+        help='Drop windows whose audio RMS is below this value (default: keep all windows)'
+    )
 
     args = parser.parse_args()
 
@@ -352,7 +484,8 @@ def main():
     elif args.command == 'prepare':
         # First validate
         print(f"Validating manifest: {args.manifest}")
-        is_valid, errors = validate_manifest(args.manifest)
+        validated_files: Set[str] = set()
+        is_valid, errors = validate_manifest(args.manifest, validated_files)
 
         if not is_valid:
             print("Manifest validation failed:")
@@ -367,7 +500,9 @@ def main():
             window_size_ms=args.window_size,
             hop_size_ms=args.hop_size,
             val_split=args.val_split,
-            seed=args.seed
+            seed=args.seed,
+            min_window_energy=args.min_window_energy,
+            validated_files=validated_files
         )
 
     else:
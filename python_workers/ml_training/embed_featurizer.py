@@ -0,0 +1,248 @@
+"""
+Embed log-mel featurization into an exported ONNX model so it takes raw PCM.
+
+The wrapped model takes `audio_pcm` float32 [batch, samples] — one window of
+16 kHz audio cut from the zero-padded file (the padding a centered STFT
+adds), long enough for exactly `frames` STFT frames — and runs STFT, mel
+projection, dB conversion and per-window normalization inside the graph, so
+ORT optimizes featurization and classifier together and the detector skips
+its Python feature pipeline.
+
+The top_db floor of training's power_to_db(ref=max) depends on the whole
+file's peak, which one window can't see, so the graph takes it as a second
+input `floor_db` float32 [1]: 10 * log10(max(peak mel power of the file,
+1e-10)) - 80, in the same (unreferenced) dB scale. The reference itself
+cancels in the per-window normalization, so with the file's floor the
+features match training (precompute_full_log_mel / data_prep) and the
+detector's mel path.
+
+Usage:
+    python python_workers/ml_training/embed_featurizer.py <model.onnx> [output_path.onnx]
+
+Example:
+    python python_workers/ml_training/embed_featurizer.py "D:/Tools/training_data/output/audio_event_detector.onnx"
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from common.audio_types import SAMPLE_RATE, N_MELS, N_FFT, HOP_LENGTH
+
+PCM_INPUT_NAME = 'audio_pcm'
+FLOOR_INPUT_NAME = 'floor_db'
+FEATURIZER_OPSET = 17  # first opset with STFT
+
+
+def pcm_window_length(frames: int = 32, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH) -> int:
+    """Samples of padded audio covering `frames` STFT frames."""
+    return (frames - 1) * hop_length + n_fft
+
+
+def build_featurizer(
+    frames: int = 32,
+    sr: int = SAMPLE_RATE,
+    n_mels: int = N_MELS,
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH,
+    opset: int = FEATURIZER_OPSET
+):
+    """
+    Build a graph mapping `audio_pcm` [batch, samples] and the file's dB
+    floor `floor_db` [1] to a normalized `mel_spectrogram` [batch, 1, n_mels, frames].
+    """
+    import librosa
+    import scipy.signal
+    from onnx import TensorProto, helper, numpy_helper
+
+    # Same filterbank and (periodic) window as librosa.feature.melspectrogram
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+    window = scipy.signal.get_window('hann', n_fft, fftbins=True).astype(np.float32)
+
+    initializers = [
+        numpy_helper.from_array(window, 'featurizer_window'),
+        numpy_helper.from_array(np.ascontiguousarray(mel_basis.T), 'featurizer_mel_basis_t'),
+        numpy_helper.from_array(np.array(hop_length, dtype=np.int64), 'featurizer_hop'),
+        numpy_helper.from_array(np.array([-1], dtype=np.int64), 'featurizer_last_axis'),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), 'featurizer_channel_axis'),
+        numpy_helper.from_array(np.array(1e-10, dtype=np.float32), 'featurizer_amin'),
+        numpy_helper.from_array(np.array(10.0 / np.log(10.0), dtype=np.float32), 'featurizer_db_scale'),
+        numpy_helper.from_array(np.array(1e-8, dtype=np.float32), 'featurizer_eps'),
+    ]
+
+    def reduce(op_type, data, output, axes):
+        # ReduceMax/ReduceMean take axes as an input from opset 18 on
+        if opset < 18:
+            return helper.make_node(op_type, [data], [output], axes=axes, keepdims=1)
+        axes_name = f'{output}_axes'
+        initializers.append(numpy_helper.from_array(np.array(axes, dtype=np.int64), axes_name))
+        return helper.make_node(op_type, [data, axes_name], [output], keepdims=1)
+
+    nodes = [
+        # [B, T] -> [B, T, 1] -> STFT [B, frames, n_fft // 2 + 1, 2]
+        helper.make_node('Unsqueeze', [PCM_INPUT_NAME, 'featurizer_last_axis'], ['featurizer_signal']),
+        helper.make_node(
+            'STFT', ['featurizer_signal', 'featurizer_hop', 'featurizer_window'],
+            ['featurizer_stft'], onesided=1
+        ),
+        helper.make_node('Mul', ['featurizer_stft', 'featurizer_stft'], ['featurizer_stft_sq']),
+        helper.make_node(
+            'ReduceSum', ['featurizer_stft_sq', 'featurizer_last_axis'], ['featurizer_power'], keepdims=0
+        ),
+        helper.make_node('MatMul', ['featurizer_power', 'featurizer_mel_basis_t'], ['featurizer_mel']),
+
+        # power_to_db(ref=max) with the file's top_db floor; the reference
+        # drops out in the normalization below
+        helper.make_node('Max', ['featurizer_mel', 'featurizer_amin'], ['featurizer_mel_clamped']),
+        helper.make_node('Log', ['featurizer_mel_clamped'], ['featurizer_log']),
+        helper.make_node('Mul', ['featurizer_log', 'featurizer_db_scale'], ['featurizer_db']),
+        helper.make_node('Max', ['featurizer_db', FLOOR_INPUT_NAME], ['featurizer_db_clipped']),
+
+        # [B, frames, n_mels] -> [B, 1, n_mels, frames], then per-window z-score
+        helper.make_node('Transpose', ['featurizer_db_clipped'], ['featurizer_db_t'], perm=[0, 2, 1]),
+        helper.make_node('Unsqueeze', ['featurizer_db_t', 'featurizer_channel_axis'], ['featurizer_db_4d']),
+        reduce('ReduceMean', 'featurizer_db_4d', 'featurizer_mean', [1, 2, 3]),
+        helper.make_node('Sub', ['featurizer_db_4d', 'featurizer_mean'], ['featurizer_centered']),
+        helper.make_node('Mul', ['featurizer_centered', 'featurizer_centered'], ['featurizer_centered_sq']),
+        reduce('ReduceMean', 'featurizer_centered_sq', 'featurizer_var', [1, 2, 3]),
+        helper.make_node('Sqrt', ['featurizer_var'], ['featurizer_std']),
+        helper.make_node('Add', ['featurizer_std', 'featurizer_eps'], ['featurizer_std_eps']),
+        helper.make_node('Div', ['featurizer_centered', 'featurizer_std_eps'], ['mel_spectrogram']),
+    ]
+
+    graph = helper.make_graph(
+        nodes, 'featurizer',
+        [
+            helper.make_tensor_value_info(
+                PCM_INPUT_NAME, TensorProto.FLOAT, ['batch_size', pcm_window_length(frames, n_fft, hop_length)]
+            ),
+            helper.make_tensor_value_info(FLOOR_INPUT_NAME, TensorProto.FLOAT, [1]),
+        ],
+        [helper.make_tensor_value_info(
+            'mel_spectrogram', TensorProto.FLOAT, ['batch_size', 1, n_mels, frames]
+        )],
+        initializers
+    )
+    return helper.make_model(graph, opset_imports=[helper.make_opsetid('', opset)])
+
+
+def embed_featurizer(onnx_path: str, output_path: str, log_fn=None) -> None:
+    """
+    Prepend the featurizer graph to a model taking `mel_spectrogram`.
+
+    Args:
+        onnx_path: Path to the ONNX model taking mel_spectrogram [B, 1, n_mels, frames]
+        output_path: Path to save the model taking audio_pcm
+        log_fn: Optional logging function (default: print)
+    """
+    import onnx
+    from onnx import compose, version_converter
+
+    if log_fn is None:
+        log_fn = print  # Default for CLI
+
+    model = onnx.load(onnx_path)
+    frames = model.graph.input[0].type.tensor_type.shape.dim[3].dim_value or 32
+
+    # Both graphs must share one opset for merging
+    opset = next(o.version for o in model.opset_import if o.domain in ('', 'ai.onnx'))
+    if opset < FEATURIZER_OPSET:
+        model = version_converter.convert_version(model, FEATURIZER_OPSET)
+        opset = FEATURIZER_OPSET
+
+    featurizer = build_featurizer(frames=frames, opset=opset)
+    featurizer.ir_version = model.ir_version
+
+    combined = compose.merge_models(
+        featurizer, model, io_map=[('mel_spectrogram', model.graph.input[0].name)]
+    )
+    onnx.checker.check_model(combined)
+    onnx.save(combined, output_path)
+
+    log_fn(f"Model with embedded featurizer saved to: {output_path}")
+
+
+def verify_embedded_model(onnx_path: str, embedded_path: str, log_fn=None) -> bool:
+    """
+    Check that the embedded model's probabilities match the original model
+    fed with the same window's features computed in NumPy.
+
+    Returns:
+        True if outputs match within tolerance
+    """
+    import librosa
+    import onnxruntime as ort
+
+    if log_fn is None:
+        log_fn = print  # Default for CLI
+
+    mel_session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    pcm_session = ort.InferenceSession(embedded_path, providers=['CPUExecutionProvider'])
+    window_length = pcm_session.get_inputs()[0].shape[1]
+
+    # Windows spanning 70 dB, so the file-level floor clips part of the
+    # quietest one (a per-window floor would clip none of it)
+    rng = np.random.default_rng(0)
+    gains = np.logspace(0, -3.5, 8, dtype=np.float32)[:, np.newaxis]
+    pcm = (0.1 * gains * rng.standard_normal((8, window_length))).astype(np.float32)
+
+    # Reference features: uncentered frames of the padded window, dB relative
+    # to the peak of all windows (the "file") clipped at its top_db floor,
+    # per-window z-score
+    mel = librosa.feature.melspectrogram(
+        y=pcm, sr=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, center=False
+    )
+    mel_db = librosa.power_to_db(mel, ref=np.max, amin=1e-10, top_db=80.0)
+    floor_db = np.array([10.0 * np.log10(max(mel.max(), 1e-10)) - 80.0], dtype=np.float32)
+    mean = mel_db.mean(axis=(1, 2), keepdims=True)
+    std = mel_db.std(axis=(1, 2), keepdims=True)
+    features = ((mel_db - mean) / (std + 1e-8))[:, np.newaxis].astype(np.float32)
+
+    mel_output = mel_session.run(None, {mel_session.get_inputs()[0].name: features})[0]
+    pcm_output = pcm_session.run(None, {PCM_INPUT_NAME: pcm, FLOOR_INPUT_NAME: floor_db})[0]
+
+    max_diff = np.max(np.abs(mel_output - pcm_output))
+    is_close = max_diff < 1e-3
+
+    if is_close:
+        log_fn(f"Embedded featurizer verification passed (max diff: {max_diff:.2e})")
+    else:
+        log_fn(f"Embedded featurizer verification FAILED (max diff: {max_diff:.2e})")
+
+    return is_close
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed mel featurization into an ONNX model")
+    parser.add_argument(
+        'model',
+        help='Path to the .onnx model taking mel_spectrogram'
+    )
+    parser.add_argument(
+        'output',
+        nargs='?',
+        default=None,
+        help='Output ONNX path (default: <model>.pcm.onnx next to the original)'
+    )
+    args = parser.parse_args()
+
+    model_path = Path(args.model)
+    if not model_path.exists():
+        print(f"Error: Model not found: {model_path}")
+        sys.exit(1)
+
+    output_path = Path(args.output) if args.output else model_path.with_suffix('.pcm.onnx')
+
+    print(f"Embedding featurizer into {model_path}...")
+    embed_featurizer(str(model_path), str(output_path))
+
+    print("\nVerifying embedded model...")
+    if not verify_embedded_model(str(model_path), str(output_path)):
+        print("\nWarning: embedded model outputs differ from the original model.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 import librosa
 from typing import Optional, Tuple, List
@@ -9,6 +10,41 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from common.audio_types import SAMPLE_RATE, N_MELS, N_FFT, HOP_LENGTH
 
 
+@functools.lru_cache(maxsize=8)
+def _mel_basis(sr: int, n_fft: int, n_mels: int) -> np.ndarray:
+    # Built once per configuration instead of on every spectrogram
+    return librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+
+
+def precompute_full_log_mel(
+    audio: np.ndarray,
+    sr: int = SAMPLE_RATE,
+    n_mels: int = N_MELS,
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH
+) -> np.ndarray:
+    """
+    Log-mel spectrogram (dB relative to the peak) of a whole signal, the same
+    as librosa.feature.melspectrogram + power_to_db(ref=np.max).
+    """
+    # Centered STFT, as the detector computes it at inference time
+    stft = librosa.stft(audio, n_fft=n_fft, hop_length=hop_length)
+    power = np.abs(stft)
+    np.square(power, out=power)
+
+    mel_spec = _mel_basis(sr, n_fft, n_mels) @ power
+    return librosa.power_to_db(mel_spec, ref=np.max)
+
+
+def _standardize(spec: np.ndarray, axis=None, inplace: bool = False) -> np.ndarray:
+    # (x - mean) / (std + 1e-8), with the std taken from the centered values
+    # already computed here instead of np.std centering the data again
+    centered = np.subtract(spec, spec.mean(axis=axis, keepdims=True), out=spec if inplace else None)
+    std = np.sqrt(np.square(centered).mean(axis=axis, keepdims=True))
+    centered /= std + 1e-8
+    return centered
+
+
 def extract_mel_spectrogram(
     audio_window: np.ndarray,
     sr: int = SAMPLE_RATE,
@@ -18,21 +54,12 @@ def extract_mel_spectrogram(
     normalize: bool = True
 ) -> np.ndarray:
     
-    # Compute mel spectrogram
-    mel_spec = librosa.feature.melspectrogram(
-        y=audio_window,
-        sr=sr,
-        n_mels=n_mels,
-        n_fft=n_fft,
-        hop_length=hop_length
-    )
-
-    # Convert to log scale (dB)
-    mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
+    # Compute mel spectrogram in dB, reusing the cached filterbank
+    mel_spec_db = precompute_full_log_mel(audio_window, sr, n_mels, n_fft, hop_length)
 
     # Normalize to zero mean, unit variance
     if normalize:
-        mel_spec_db = (mel_spec_db - mel_spec_db.mean()) / (mel_spec_db.std() + 1e-8)
+        mel_spec_db = _standardize(mel_spec_db, inplace=True)
 
     return mel_spec_db
 
@@ -46,14 +73,24 @@ def extract_batch_mel_spectrograms(
     normalize: bool = True
 ) -> np.ndarray:
 
-    spectrograms = []
-    for window in audio_windows:
-        mel_spec = extract_mel_spectrogram(
-            window, sr, n_mels, n_fft, hop_length, normalize
-        )
-        spectrograms.append(mel_spec)
+    # One STFT over the stacked [batch, samples] windows: numpy's FFT plan
+    # and the Hann window are set up once for the whole batch
+    stft = librosa.stft(np.stack(audio_windows), n_fft=n_fft, hop_length=hop_length)
+    power = np.abs(stft)
+    np.square(power, out=power)
+    mel_spec = _mel_basis(sr, n_fft, n_mels) @ power
 
-    return np.stack(spectrograms, axis=0)
+    # power_to_db(ref=np.max) of each window, as in extract_mel_spectrogram
+    amin = 1e-10
+    mel_spec_db = 10.0 * np.log10(np.maximum(amin, mel_spec))
+    mel_spec_db -= 10.0 * np.log10(np.maximum(amin, mel_spec.max(axis=(1, 2), keepdims=True)))
+    np.maximum(mel_spec_db, mel_spec_db.max(axis=(1, 2), keepdims=True) - 80.0, out=mel_spec_db)
+
+    # Normalize to zero mean, unit variance
+    if normalize:
+        mel_spec_db = _standardize(mel_spec_db, axis=(1, 2), inplace=True)
+
+    return mel_spec_db
 
 
 def extract_windows_from_full_spectrogram(
@@ -64,37 +101,46 @@ def extract_windows_from_full_spectrogram(
     n_mels: int = N_MELS,
     n_fft: int = N_FFT,
     hop_length: int = HOP_LENGTH,
-    normalize: bool = True
+    normalize: bool = True,
+    min_window_energy: Optional[float] = None
 ) -> List[np.ndarray]:
 
-    # Compute full mel spectrogram once
-    full_mel_spec = librosa.feature.melspectrogram(
-        y=audio, sr=sr, n_mels=n_mels, n_fft=n_fft, hop_length=hop_length
-    )
-    full_mel_spec_db = librosa.power_to_db(full_mel_spec, ref=np.max)
-
-    # Calculate frame counts
+    # Calculate frame counts (a centered STFT has 1 + len // hop_length frames)
     frames_per_window = window_samples // hop_length
     frames_per_hop = hop_samples // hop_length
+    total_frames = 1 + len(audio) // hop_length
+    frame_starts = np.arange(0, total_frames - frames_per_window + 1, frames_per_hop)
+
+    # Optionally drop windows whose audio RMS is below min_window_energy,
+    # measured for all windows at once on strided views of the signal
+    keep = np.ones(len(frame_starts), dtype=bool)
+    if min_window_energy is not None and len(frame_starts):
+        span = frames_per_window * hop_length
+        sample_starts = frame_starts * hop_length
+        padded = np.pad(audio, (0, max(0, int(sample_starts[-1]) + span - len(audio))))
+        spans = np.lib.stride_tricks.sliding_window_view(padded, span)[sample_starts]
+        rms = np.sqrt(np.einsum('ij,ij->i', spans, spans) / span)
+        keep = rms >= min_window_energy
+
+    # Too short for a window, or every window too quiet: skip the STFT
+    if not keep.any():
+        return []
+
+    # Compute full mel spectrogram once; windows are slices of it
+    full_mel_spec_db = precompute_full_log_mel(audio, sr, n_mels, n_fft, hop_length)
+
+    # Gather every window at once from strided views into one contiguous
+    # [n_windows, n_mels, frames] array; the frame starts above keep each
+    # window inside the spectrogram, so none needs padding
+    windows = np.lib.stride_tricks.sliding_window_view(
+        full_mel_spec_db, frames_per_window, axis=1
+    ).transpose(1, 0, 2)[frame_starts[keep]]
+
+    # Normalize per-window, in place
+    if normalize:
+        windows = _standardize(windows, axis=(1, 2), inplace=True)
 
-    windows = []
-    total_frames = full_mel_spec_db.shape[1]
-
-    for frame_start in range(0, total_frames - frames_per_window + 1, frames_per_hop):
-        # Slice window from full spectrogram
-        mel_window = full_mel_spec_db[:, frame_start:frame_start + frames_per_window]
-
-        # Pad if needed (edge case)
-        if mel_window.shape[1] < frames_per_window:
-            mel_window = np.pad(mel_window, ((0, 0), (0, frames_per_window - mel_window.shape[1])))
-
-        # Normalize per-window
-        if normalize:
-            mel_window = (mel_window - mel_window.mean()) / (mel_window.std() + 1e-8)
-
-        windows.append(mel_window)
-
-    return windows
+    return list(windows)
 
 
 def get_expected_spectrogram_shape(
@@ -111,10 +157,12 @@ def get_expected_spectrogram_shape(
 def apply_time_masking(
     spectrogram: np.ndarray,
     max_mask_width: int = 5,
-    num_masks: int = 1
+    num_masks: int = 1,
+    copy: bool = True
 ) -> np.ndarray:
 
-    spec = spectrogram.copy()
+    # copy=False masks in place, for callers that own the array
+    spec = spectrogram.copy() if copy else spectrogram
     _, time_frames = spec.shape
 
     for _ in range(num_masks):
@@ -128,10 +176,12 @@ def apply_time_masking(
 def apply_frequency_masking(
     spectrogram: np.ndarray,
     max_mask_width: int = 10,
-    num_masks: int = 1
+    num_masks: int = 1,
+    copy: bool = True
 ) -> np.ndarray:
 
-    spec = spectrogram.copy()
+    # copy=False masks in place, for callers that own the array
+    spec = spectrogram.copy() if copy else spectrogram
     n_mels, _ = spec.shape
 
     for _ in range(num_masks):
@@ -142,13 +192,57 @@ def apply_frequency_masking(
     return spec
 
 
+def apply_specaugment_batch(
+    specs,
+    time_mask_max_width: int = 5,
+    freq_mask_max_width: int = 10,
+    gain_range: Tuple[float, float] = (-3.0, 3.0),
+    p: float = 0.5,
+    num_masks: int = 1
+):
+    """
+    apply_time_masking, apply_frequency_masking and apply_gain_augmentation
+    for a whole batch tensor [batch, ..., n_mels, time] on its own device.
+    Each is applied to a sample with probability `p`, as AudioDataset does
+    per sample; all mask bounds are drawn at once.
+    """
+    import torch
+
+    batch = specs.shape[0]
+    n_mels, frames = specs.shape[-2:]
+    device = specs.device
+    # Dims between batch and (n_mels, time), e.g. the channel
+    inner = (1,) * (specs.dim() - 3)
+
+    def band_mask(size: int, max_mask_width: int):
+        # Same widths/starts as the NumPy versions: width in [1, max],
+        # start in [0, max(1, size - width))
+        width = torch.randint(1, max_mask_width + 1, (batch, num_masks), device=device)
+        start = (torch.rand(batch, num_masks, device=device) * (size - width).clamp(min=1)).long()
+        pos = torch.arange(size, device=device)
+        inside = (pos >= start[..., None]) & (pos < (start + width)[..., None])
+        apply = torch.rand(batch, 1, 1, device=device) < p
+        return (inside & apply).any(dim=1)
+
+    time_mask = band_mask(frames, time_mask_max_width).view(batch, *inner, 1, frames)
+    freq_mask = band_mask(n_mels, freq_mask_max_width).view(batch, *inner, n_mels, 1)
+    specs = specs.masked_fill(time_mask | freq_mask, 0.0)
+
+    gain_db = torch.empty(batch, device=device).uniform_(gain_range[0], gain_range[1])
+    gain_db = gain_db * (torch.rand(batch, device=device) < p)
+    return specs + gain_db.view(batch, *inner, 1, 1)
+
+
 def apply_gain_augmentation(
     spectrogram: np.ndarray,
-    gain_range: Tuple[float, float] = (-3.0, 3.0)
+    gain_range: Tuple[float, float] = (-3.0, 3.0),
+    *,
+    out: Optional[np.ndarray] = None
 ) -> np.ndarray:
 
+    # out=spectrogram adds the gain in place
     gain_db = np.random.uniform(gain_range[0], gain_range[1])
-    return spectrogram + gain_db
+    return np.add(spectrogram, gain_db, out=out)
 
 
 def augment_spectrogram(
@@ -158,19 +252,26 @@ def augment_spectrogram(
     gain_range: Tuple[float, float] = (-3.0, 3.0),
     apply_time: bool = True,
     apply_freq: bool = True,
-    apply_gain: bool = True
+    apply_gain: bool = True,
+    out: Optional[np.ndarray] = None
 ) -> np.ndarray:
 
-    aug_spec = spectrogram.copy()
+    # The one private copy every step below works in; callers augmenting
+    # many spectrograms can pass a reusable scratch array as `out`
+    if out is None:
+        out = np.empty_like(spectrogram)
+    np.copyto(out, spectrogram)
+    aug_spec = out
 
+    # aug_spec is already a private copy, so mask it in place
     if apply_time:
-        aug_spec = apply_time_masking(aug_spec, time_mask_width)
+        aug_spec = apply_time_masking(aug_spec, time_mask_width, copy=False)
 
     if apply_freq:
-        aug_spec = apply_frequency_masking(aug_spec, freq_mask_width)
+        aug_spec = apply_frequency_masking(aug_spec, freq_mask_width, copy=False)
 
     if apply_gain:
-        aug_spec = apply_gain_augmentation(aug_spec, gain_range)
+        aug_spec = apply_gain_augmentation(aug_spec, gain_range, out=aug_spec)
 
     return aug_spec
 
@@ -0,0 +1,132 @@
+"""
+Quantize an exported ONNX model's weights to INT8 for CPU inference.
+
+Dynamic quantization: weights are stored as int8 and activations are
+quantized on the fly, so the model still takes and returns float32 tensors
+and the audio detector needs no changes to use it.
+
+The output is named <model>.int8-dyn.onnx by default: <model>.int8.onnx is the
+audio detector's own cached quantization, which it would otherwise load in
+place of its full dynamic quantization.
+
+Quantize groups:
+    classifier  Only the Linear layers of the classifier head (Gemm/MatMul)
+    full        The Conv2d backbone too (ConvInteger kernels)
+
+Usage:
+    python python_workers/ml_training/quantize_int8.py <model.onnx> [output_path.onnx] [--groups classifier|full]
+
+Example:
+    python python_workers/ml_training/quantize_int8.py "D:/Tools/training_data/output/audio_event_detector.onnx"
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Default output suffix, distinct from the audio detector's .int8.onnx cache
+INT8_SUFFIX = '.int8-dyn.onnx'
+
+# ONNX op types quantized for each group
+QUANTIZE_GROUPS = {
+    'classifier': ['Gemm', 'MatMul'],
+    'full': ['Gemm', 'MatMul', 'Conv'],
+}
+
+
+def quantize_to_int8(onnx_path: str, output_path: str, groups: str = 'classifier', log_fn=None) -> None:
+    """
+    Dynamically quantize the weights of an ONNX model to INT8.
+
+    Args:
+        onnx_path: Path to the float32 ONNX model
+        output_path: Path to save the quantized model
+        groups: Which layers to quantize ("classifier" or "full")
+        log_fn: Optional logging function (default: print)
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    if log_fn is None:
+        log_fn = print  # Default for CLI
+
+    if groups not in QUANTIZE_GROUPS:
+        raise ValueError(f"Unknown quantize groups: {groups}")
+
+    quantize_dynamic(
+        onnx_path,
+        output_path,
+        op_types_to_quantize=QUANTIZE_GROUPS[groups],
+        weight_type=QuantType.QInt8,
+    )
+
+    log_fn(f"INT8 model ({groups}) saved to: {output_path}")
+
+
+def verify_int8_model(onnx_path: str, int8_path: str, tolerance: float = 1e-3, log_fn=None) -> bool:
+    """
+    Check that the INT8 model's probabilities stay close to the original's.
+
+    Returns:
+        True if outputs match within tolerance
+    """
+    import onnxruntime as ort
+
+    if log_fn is None:
+        log_fn = print  # Default for CLI
+
+    test_input = np.random.randn(8, 1, 128, 32).astype(np.float32)
+
+    fp32_session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    int8_session = ort.InferenceSession(int8_path, providers=['CPUExecutionProvider'])
+    fp32_output = fp32_session.run(None, {'mel_spectrogram': test_input})[0]
+    int8_output = int8_session.run(None, {'mel_spectrogram': test_input})[0]
+
+    max_diff = np.max(np.abs(fp32_output - int8_output))
+    is_close = max_diff < tolerance
+
+    if is_close:
+        log_fn(f"INT8 verification passed (max diff: {max_diff:.2e})")
+    else:
+        log_fn(f"INT8 verification FAILED (max diff: {max_diff:.2e})")
+
+    return is_close
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize ONNX model weights to INT8")
+    parser.add_argument(
+        'model',
+        help='Path to the float32 .onnx model'
+    )
+    parser.add_argument(
+        'output',
+        nargs='?',
+        default=None,
+        help='Output ONNX path (default: <model>.int8-dyn.onnx next to the original)'
+    )
+    parser.add_argument(
+        '--groups',
+        choices=sorted(QUANTIZE_GROUPS),
+        default='classifier',
+        help='Layers to quantize: classifier head only, or the conv backbone too'
+    )
+    args = parser.parse_args()
+
+    model_path = Path(args.model)
+    if not model_path.exists():
+        print(f"Error: Model not found: {model_path}")
+        sys.exit(1)
+
+    output_path = Path(args.output) if args.output else model_path.with_suffix(INT8_SUFFIX)
+
+    print(f"Quantizing {model_path} to INT8 ({args.groups})...")
+    quantize_to_int8(str(model_path), str(output_path), groups=args.groups)
+
+    print("\nVerifying INT8 model...")
+    if not verify_int8_model(str(model_path), str(output_path)):
+        print("\nWarning: INT8 outputs differ noticeably from the original model.")
+
+
+if __name__ == '__main__':
+    main()
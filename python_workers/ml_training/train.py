@@ -18,15 +18,14 @@ import numpy as np
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any, Callable
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
 import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import Dataset, DataLoader
 from torch.utils.tensorboard import SummaryWriter
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-)
+from sklearn.metrics import roc_auc_score
 from tqdm import tqdm
 
 # Global flag to track if we're running in worker mode (to disable tqdm and use proper logging)
@@ -52,9 +51,10 @@ def _log(message: str, level: str = "info"):
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from common.audio_types import TrainingConfig
-from ml_training.model import create_model, export_to_onnx, verify_onnx_model
+from ml_training.model import create_model, export_to_onnx, quantize_static_int8, verify_onnx_model
+from ml_training.data_prep import SHARD_SUFFIX, TARGET_FRAMES, fit_frames
 from ml_training.feature_extraction import (
-    apply_time_masking, apply_frequency_masking, apply_gain_augmentation, mixup
+    apply_time_masking, apply_frequency_masking, apply_gain_augmentation, apply_specaugment_batch, mixup
 )
 
 
@@ -82,11 +82,14 @@ class AudioDataset(Dataset):
 
         # Load positive samples
         pos_dir = self.data_dir / split / 'positive'
-        self.positive_files = list(pos_dir.glob('*.npy'))
+        self.positive_files = self._list_samples(pos_dir)
 
         # Load negative samples
         neg_dir = self.data_dir / split / 'negative'
-        self.negative_files = list(neg_dir.glob('*.npy'))
+        self.negative_files = self._list_samples(neg_dir)
+
+        # Window shards, memory-mapped on first use in each DataLoader worker
+        self._shards: Dict[Path, np.ndarray] = {}
 
         # Combine with labels
         self.samples = [
@@ -97,25 +100,39 @@ class AudioDataset(Dataset):
 
         _log(f"Loaded {len(self.positive_files)} positive and {len(self.negative_files)} negative {split} samples")
 
+    @staticmethod
+    def _list_samples(sample_dir: Path) -> List[Tuple[Path, Optional[int]]]:
+        """(file, row) per sample: a row of a window shard, or a single-sample .npy (row None)."""
+        samples = []
+        for path in sorted(sample_dir.glob('*.npy')):
+            if path.name.endswith(SHARD_SUFFIX):
+                num_rows = np.load(path, mmap_mode='r').shape[0]
+                samples.extend((path, row) for row in range(num_rows))
+            else:
+                samples.append((path, None))
+        return samples
+
     def __len__(self) -> int:
         return len(self.samples)
 
     def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
-        file_path, label = self.samples[idx]
+        (file_path, row), label = self.samples[idx]
 
         # Load spectrogram
-        spec = np.load(file_path)
+        if row is None:
+            spec = np.load(file_path)
+        else:
+            shard = self._shards.get(file_path)
+            if shard is None:
+                shard = self._shards[file_path] = np.load(file_path, mmap_mode='r')
+            # Read-only view into the page cache; the steps below make new arrays
+            spec = shard[row]
+
+        # Windows may be stored as float16; compute in float32
+        spec = spec.astype(np.float32, copy=False)
 
         # Ensure consistent dimensions - model expects (128, 32)
-        target_frames = 32
-        if spec.shape[1] > target_frames:
-            # Trim to target size (take center portion)
-            start = (spec.shape[1] - target_frames) // 2
-            spec = spec[:, start:start + target_frames]
-        elif spec.shape[1] < target_frames:
-            # Pad to target size
-            pad_width = target_frames - spec.shape[1]
-            spec = np.pad(spec, ((0, 0), (0, pad_width)), mode='constant')
+        spec = fit_frames(spec, TARGET_FRAMES)
 
         # Normalize to zero mean, unit variance (must match inference preprocessing)
         spec = (spec - spec.mean()) / (spec.std() + 1e-8)
@@ -134,17 +151,19 @@ class AudioDataset(Dataset):
 
     def _apply_augmentation(self, spec: np.ndarray) -> np.ndarray:
         """Apply data augmentation to spectrogram."""
+        # spec is the freshly normalized array from __getitem__, so the masks
+        # are applied in place
         # Time masking
         if np.random.random() < 0.5:
-            spec = apply_time_masking(spec, self.config.time_mask_max_width)
+            spec = apply_time_masking(spec, self.config.time_mask_max_width, copy=False)
 
         # Frequency masking
         if np.random.random() < 0.5:
-            spec = apply_frequency_masking(spec, self.config.freq_mask_max_width)
+            spec = apply_frequency_masking(spec, self.config.freq_mask_max_width, copy=False)
 
         # Gain augmentation
         if np.random.random() < 0.5:
-            spec = apply_gain_augmentation(spec, self.config.gain_range)
+            spec = apply_gain_augmentation(spec, self.config.gain_range, out=spec)
 
         return spec
 
@@ -219,6 +238,44 @@ def load_pretrained_weights(model: nn.Module, checkpoint_path: str, device: torc
         return False
 
 
+def _cpu_copy(obj: Any) -> Any:
+    """Deep copy of a (nested) checkpoint dict with every tensor detached and copied to CPU."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {key: _cpu_copy(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_cpu_copy(value) for value in obj)
+    return obj
+
+
+class CheckpointWriter:
+    """
+    Saves checkpoints on a background thread so the training loop doesn't
+    block on disk. The checkpoint is snapshotted to CPU before save() returns;
+    at most one write is in flight, and write errors surface on the next
+    save() or wait().
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def save(self, checkpoint: Dict[str, Any], path: Path) -> None:
+        self.wait()
+        self._pending = self._executor.submit(torch.save, _cpu_copy(checkpoint), path)
+
+    def wait(self) -> None:
+        """Block until the last checkpoint is on disk."""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self) -> None:
+        self.wait()
+        self._executor.shutdown()
+
+
 class EarlyStopping:
     """Early stopping to prevent overfitting."""
 
@@ -243,6 +300,56 @@ class EarlyStopping:
         return self.early_stop
 
 
+def _binary_metrics(labels: np.ndarray, probs: np.ndarray) -> Dict[str, float]:
+    """
+    Accuracy, precision, recall, F1 (threshold 0.5) and ROC AUC.
+
+    The four threshold metrics come from one confusion matrix, with sklearn's
+    zero_division=0 semantics; roc_auc_score is the only sklearn pass.
+    """
+    actual = labels == 1
+    predicted = probs > 0.5
+    num_samples = actual.size
+    tp = int(np.count_nonzero(actual & predicted))
+    num_actual = int(np.count_nonzero(actual))
+    num_predicted = int(np.count_nonzero(predicted))
+    fp = num_predicted - tp
+    fn = num_actual - tp
+    tn = num_samples - tp - fp - fn
+
+    return {
+        'accuracy': (tp + tn) / num_samples if num_samples else 0.0,
+        'precision': tp / num_predicted if num_predicted else 0.0,
+        'recall': tp / num_actual if num_actual else 0.0,
+        'f1': 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0,
+        'auc': roc_auc_score(labels, probs) if 0 < num_actual < num_samples else 0
+    }
+
+
+def _prediction_buffers(loader: DataLoader, device: torch.device) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Host buffers for an epoch's probabilities and labels (pinned for async copies from the GPU)."""
+    num_samples = len(loader.dataset)
+    pin = device.type == 'cuda'
+    return (
+        torch.empty(num_samples, pin_memory=pin),
+        torch.empty(num_samples, pin_memory=pin),
+    )
+
+
+def _store_predictions(
+    all_preds: torch.Tensor,
+    all_labels: torch.Tensor,
+    offset: int,
+    probs: torch.Tensor,
+    labels: torch.Tensor
+) -> int:
+    """Copy a batch into the buffers at `offset` without waiting on the device; returns the new offset."""
+    end = offset + labels.shape[0]
+    all_preds[offset:end].copy_(probs.reshape(-1), non_blocking=True)
+    all_labels[offset:end].copy_(labels.reshape(-1), non_blocking=True)
+    return end
+
+
 def train_epoch(
     model: nn.Module,
     loader: DataLoader,
@@ -250,14 +357,20 @@ def train_epoch(
     optimizer: optim.Optimizer,
     device: torch.device,
     scaler: Optional[torch.cuda.amp.GradScaler] = None,
-    use_amp: bool = False
+    use_amp: bool = False,
+    augment_config: Optional[TrainingConfig] = None
 ) -> Dict[str, float]:
-    """Train for one epoch with optional mixed precision."""
+    """
+    Train for one epoch with optional mixed precision.
+
+    With `augment_config`, each batch is augmented on the device (see
+    apply_specaugment_batch) instead of sample by sample in the DataLoader.
+    """
     model.train()
 
-    total_loss = 0
-    all_preds = []
-    all_labels = []
+    total_loss = torch.zeros((), device=device)
+    all_preds, all_labels = _prediction_buffers(loader, device)
+    offset = 0
     total_batches = len(loader)
     batch_idx = 0
 
@@ -276,12 +389,20 @@ def train_epoch(
         batch_idx += 1
 
         try:
-            batch_x = batch_x.to(device, non_blocking=True)
+            batch_x = batch_x.to(device, non_blocking=True, memory_format=torch.channels_last)
             batch_y = batch_y.to(device, non_blocking=True)
         except Exception as e:
             _log(f"    ERROR moving batch to device: {type(e).__name__}: {e}", "error")
             raise
 
+        if augment_config is not None:
+            batch_x = apply_specaugment_batch(
+                batch_x,
+                augment_config.time_mask_max_width,
+                augment_config.freq_mask_max_width,
+                augment_config.gain_range
+            )
+
         optimizer.zero_grad()
 
         # Mixed precision training
@@ -301,24 +422,19 @@ def train_epoch(
             loss.backward()
             optimizer.step()
 
-        total_loss += loss.item()
+        total_loss += loss.detach()
         # Apply sigmoid to convert logits to probabilities for metrics
-        probs = torch.sigmoid(outputs).detach().cpu().numpy()
-        all_preds.extend(probs)
-        all_labels.extend(batch_y.cpu().numpy())
+        offset = _store_predictions(all_preds, all_labels, offset, torch.sigmoid(outputs.detach()), batch_y)
 
     # Calculate metrics
-    all_preds = np.array(all_preds).flatten()
-    all_labels = np.array(all_labels).flatten()
-    pred_binary = (all_preds > 0.5).astype(int)
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+    all_preds = all_preds[:offset].numpy()
+    all_labels = all_labels[:offset].numpy()
 
     return {
-        'loss': total_loss / len(loader),
-        'accuracy': accuracy_score(all_labels, pred_binary),
-        'precision': precision_score(all_labels, pred_binary, zero_division=0),
-        'recall': recall_score(all_labels, pred_binary, zero_division=0),
-        'f1': f1_score(all_labels, pred_binary, zero_division=0),
-        'auc': roc_auc_score(all_labels, all_preds) if len(np.unique(all_labels)) > 1 else 0
+        'loss': total_loss.item() / len(loader),
+        **_binary_metrics(all_labels, all_preds)
     }
 
 
@@ -332,15 +448,15 @@ def evaluate(
     """Evaluate model on validation set with optional mixed precision."""
     model.eval()
 
-    total_loss = 0
-    all_preds = []
-    all_labels = []
+    total_loss = torch.zeros((), device=device)
+    all_preds, all_labels = _prediction_buffers(loader, device)
+    offset = 0
 
     with torch.no_grad():
         # Disable tqdm in worker mode to avoid stdout interference
         loader_iter = tqdm(loader, desc="Evaluating", leave=False, disable=_WORKER_MODE)
         for batch_x, batch_y in loader_iter:
-            batch_x = batch_x.to(device, non_blocking=True)
+            batch_x = batch_x.to(device, non_blocking=True, memory_format=torch.channels_last)
             batch_y = batch_y.to(device, non_blocking=True)
 
             # Use AMP for inference too
@@ -352,33 +468,29 @@ def evaluate(
                 outputs = model(batch_x)
                 loss = criterion(outputs, batch_y)
 
-            total_loss += loss.item()
+            total_loss += loss
             # Apply sigmoid to convert logits to probabilities for metrics
-            probs = torch.sigmoid(outputs).cpu().numpy()
-            all_preds.extend(probs)
-            all_labels.extend(batch_y.cpu().numpy())
+            offset = _store_predictions(all_preds, all_labels, offset, torch.sigmoid(outputs), batch_y)
 
     # Calculate metrics
-    all_preds = np.array(all_preds).flatten()
-    all_labels = np.array(all_labels).flatten()
-    pred_binary = (all_preds > 0.5).astype(int)
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+    all_preds = all_preds[:offset].numpy()
+    all_labels = all_labels[:offset].numpy()
 
     return {
-        'loss': total_loss / len(loader),
-        'accuracy': accuracy_score(all_labels, pred_binary),
-        'precision': precision_score(all_labels, pred_binary, zero_division=0),
-        'recall': recall_score(all_labels, pred_binary, zero_division=0),
-        'f1': f1_score(all_labels, pred_binary, zero_division=0),
-        'auc': roc_auc_score(all_labels, all_preds) if len(np.unique(all_labels)) > 1 else 0
+        'loss': total_loss.item() / len(loader),
+        **_binary_metrics(all_labels, all_preds)
     }
 
 
-def train_model(config_path: str) -> str:
+def train_model(config_path: str, int8: bool = False) -> str:
     """
     Train the audio event detection model.
 
     Args:
         config_path: Path to training configuration YAML file
+        int8: Also export a static INT8 quantized ONNX model (cnn_v1 architectures)
 
     Returns:
         Path to best model checkpoint
@@ -412,7 +524,8 @@ def train_model(config_path: str) -> str:
         print("  Mixed Precision (AMP): ENABLED ⚡")
 
     # Create datasets
-    train_dataset = AudioDataset(data_dir, split='train', augment=True, config=config)
+    # Augmented per batch on the device in train_epoch
+    train_dataset = AudioDataset(data_dir, split='train', augment=False, config=config)
     val_dataset = AudioDataset(data_dir, split='val', augment=False, config=config)
 
     # Optimize num_workers for multi-threaded data loading
@@ -422,6 +535,17 @@ def train_model(config_path: str) -> str:
     else:
         num_workers = 4 if device.type == 'cuda' else 0
 
+    # torch.compile with inductor backend requires Triton, which is not supported on Windows
+    compile_model = hasattr(torch, 'compile') and device.type == 'cuda' and platform.system() != 'Windows'
+
+    # A compiled model's CUDA graph is replayed only for a fixed batch shape, so
+    # the short last batch is dropped rather than recaptured. Shuffling picks
+    # different dropped samples each epoch. Eager training keeps every sample
+    drop_last = compile_model and len(train_dataset) >= config.batch_size
+    if drop_last and len(train_dataset) % config.batch_size:
+        print(f"  Dropping the last {len(train_dataset) % config.batch_size} shuffled samples "
+              f"of each epoch (fixed batch shape for the compiled model)")
+
     # Create dataloaders
     train_loader = DataLoader(
         train_dataset,
@@ -430,7 +554,8 @@ def train_model(config_path: str) -> str:
         num_workers=num_workers,
         pin_memory=True if device.type == 'cuda' else False,
         persistent_workers=True if num_workers > 0 else False,  # Keep workers alive
-        prefetch_factor=2 if num_workers > 0 else None  # Prefetch batches
+        prefetch_factor=2 if num_workers > 0 else None,  # Prefetch batches
+        drop_last=drop_last
     )
     val_loader = DataLoader(
         val_dataset,
@@ -444,14 +569,16 @@ def train_model(config_path: str) -> str:
 
     # Create model
     model = create_model(model_architecture)
-    model = model.to(device)
+    # NHWC weights and activations: faster cuDNN/oneDNN conv kernels (ONNX export is unaffected)
+    model = model.to(device, memory_format=torch.channels_last)
     print(f"Model: {model_architecture} ({model.count_parameters():,} parameters)")
 
     # Compile model for PyTorch 2.0+ (30% faster)
-    # Note: torch.compile with inductor backend requires Triton, which is not supported on Windows
-    if hasattr(torch, 'compile') and device.type == 'cuda' and platform.system() != 'Windows':
+    # reduce-overhead replays CUDA graphs: the small model's steps are bound by
+    # kernel launch overhead, not compute
+    if compile_model:
         try:
-            model = torch.compile(model, mode='default')
+            model = torch.compile(model, mode='reduce-overhead')
             print("  Model Compilation: ENABLED ⚡")
         except Exception as e:
             print(f"  Model Compilation: Skipped ({str(e)})")
@@ -489,13 +616,17 @@ def train_model(config_path: str) -> str:
     best_f1 = 0
     best_model_path = None
 
+    checkpoint_writer = CheckpointWriter()
+
     print(f"\nStarting training for {config.epochs} epochs...")
 
     for epoch in range(config.epochs):
         print(f"\nEpoch {epoch + 1}/{config.epochs}")
 
         # Train
-        train_metrics = train_epoch(model, train_loader, criterion, optimizer, device, scaler, use_amp)
+        train_metrics = train_epoch(
+            model, train_loader, criterion, optimizer, device, scaler, use_amp, augment_config=config
+        )
 
         # Validate
         val_metrics = evaluate(model, val_loader, criterion, device, use_amp)
@@ -520,7 +651,7 @@ def train_model(config_path: str) -> str:
         if val_metrics['f1'] > best_f1:
             best_f1 = val_metrics['f1']
             best_model_path = output_dir / 'best_model.pt'
-            torch.save({
+            checkpoint_writer.save({
                 'epoch': epoch,
                 'model_state_dict': model.state_dict(),
                 'optimizer_state_dict': optimizer.state_dict(),
@@ -535,6 +666,7 @@ def train_model(config_path: str) -> str:
             break
 
     writer.close()
+    checkpoint_writer.close()
 
     # Export to ONNX
     if config.export_onnx and best_model_path:
@@ -551,6 +683,18 @@ def train_model(config_path: str) -> str:
         # Verify ONNX model
         verify_onnx_model(str(onnx_path), model)
 
+        if int8:
+            print("\nExporting static INT8 model to ONNX...")
+            try:
+                # Unwrap torch.compile so the eager modules can be fused
+                model_q = quantize_static_int8(getattr(model, '_orig_mod', model), val_loader)
+                # Not .int8.onnx: that name is the audio detector's own dynamic-quant cache
+                int8_path = output_dir / 'audio_event_detector.int8-static.onnx'
+                export_to_onnx(model_q, str(int8_path))
+                verify_onnx_model(str(int8_path), model_q, tolerance=1e-3)
+            except Exception as e:
+                print(f"  INT8 export failed: {e}")
+
     print(f"\nTraining complete!")
     print(f"Best model saved to: {best_model_path}")
     print(f"Best validation F1: {best_f1:.4f}")
@@ -637,7 +781,8 @@ def train_model_with_progress(
     # Create datasets
     _log("Creating datasets...")
     try:
-        train_dataset = AudioDataset(data_dir, split='train', augment=True, config=config)
+        # Augmented per batch on the device in train_epoch
+        train_dataset = AudioDataset(data_dir, split='train', augment=False, config=config)
         _log(f"Train dataset created: {len(train_dataset)} samples")
     except Exception as e:
         _log(f"ERROR creating train dataset: {type(e).__name__}: {e}", "error")
@@ -689,7 +834,7 @@ def train_model_with_progress(
     # Create model
     _log("Creating model...")
     try:
-        model = create_model('cnn_v1').to(device)
+        model = create_model('cnn_v1').to(device, memory_format=torch.channels_last)
         _log(f"Model created and moved to {device}")
     except Exception as e:
         _log(f"ERROR creating model: {type(e).__name__}: {e}", "error")
@@ -764,6 +909,7 @@ def train_model_with_progress(
     output_dir.mkdir(parents=True, exist_ok=True)
     best_model_path = output_dir / 'best_model.pt'
     layers_unfrozen = False
+    checkpoint_writer = CheckpointWriter()
 
     _log("=" * 60)
     _log(f"STARTING TRAINING LOOP: {config.epochs} epochs")
@@ -791,7 +937,9 @@ def train_model_with_progress(
                 _log(f"Learning rate reduced to {config.learning_rate * 0.1} for fine-tuning all layers")
 
             _log(f"  Starting train_epoch...")
-            train_metrics = train_epoch(model, train_loader, criterion, optimizer, device, scaler, use_amp)
+            train_metrics = train_epoch(
+                model, train_loader, criterion, optimizer, device, scaler, use_amp, augment_config=config
+            )
             _log(f"  Train: loss={train_metrics['loss']:.4f}, acc={train_metrics['accuracy']:.4f}, f1={train_metrics['f1']:.4f}")
 
             _log(f"  Starting evaluate...")
@@ -810,7 +958,7 @@ def train_model_with_progress(
                 best_f1 = val_metrics['f1']
                 best_metrics = val_metrics
                 _log(f"  NEW BEST MODEL: f1={best_f1:.4f}, saving to {best_model_path}")
-                torch.save({
+                checkpoint_writer.save({
                     'epoch': epoch,
                     'model_state_dict': model.state_dict(),
                     'val_metrics': val_metrics,
@@ -824,6 +972,8 @@ def train_model_with_progress(
             _log(f"Traceback:\n{traceback.format_exc()}", "error")
             raise
 
+    checkpoint_writer.close()
+
     # Export to ONNX
     export_failed = False
     if best_model_path.exists():
@@ -873,6 +1023,11 @@ def main():
         default=None,
         help='Path to checkpoint to resume from'
     )
+    parser.add_argument(
+        '--int8',
+        action='store_true',
+        help='Also export a static INT8 quantized ONNX model'
+    )
 
     args = parser.parse_args()
 
@@ -880,7 +1035,7 @@ def main():
         print(f"Config file not found: {args.config}")
         sys.exit(1)
 
-    train_model(args.config)
+    train_model(args.config, int8=args.int8)
 
 
 if __name__ == '__main__':
@@ -421,6 +421,15 @@ class ModelEnhancer(WorkerBase):
         hop_length = 512
         sample_rate = 16000
 
+        # Resolve librosa entry points once rather than per file
+        load = librosa.load
+        stft = librosa.stft
+
+        # Build the STFT window and mel filterbank once; melspectrogram would
+        # rebuild both for every file
+        window = librosa.filters.get_window('hann', n_fft, fftbins=True)
+        mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels)
+
         def process_wav_dir(wav_dir: Path, output_dir: Path):
             output_dir.mkdir(parents=True, exist_ok=True)
             wav_files = list(wav_dir.glob('*.wav'))
@@ -428,20 +437,28 @@ class ModelEnhancer(WorkerBase):
             for wav_file in wav_files:
                 try:
                     # Load audio
-                    audio, sr = librosa.load(wav_file, sr=sample_rate, mono=True)
-                    # Normalize audio waveform (must match inference preprocessing)
-                    audio = librosa.util.normalize(audio)
-
-                    # Compute mel spectrogram
-                    mel_spec = librosa.feature.melspectrogram(
-                        y=audio, sr=sr, n_mels=n_mels,
-                        n_fft=n_fft, hop_length=hop_length
-                    )
-                    mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
+                    audio, sr = load(wav_file, sr=sample_rate, mono=True)
+                    # Peak-normalize the waveform in place, as librosa.util.normalize
+                    # does (must match inference preprocessing)
+                    peak = float(np.abs(audio).max()) if audio.size else 0.0
+                    if peak > np.finfo(np.float32).tiny:
+                        audio /= peak
+
+                    # Compute mel spectrogram (same as librosa.feature.melspectrogram)
+                    spectrum = stft(y=audio, n_fft=n_fft, hop_length=hop_length, window=window)
+                    mel_spec = mel_basis @ (spectrum.real ** 2 + spectrum.imag ** 2)
+
+                    # power_to_db(mel_spec, ref=np.max) in place (amin=1e-10, top_db=80)
+                    ref_db = 10.0 * np.log10(max(float(mel_spec.max(initial=0.0)), 1e-10))
+                    np.maximum(mel_spec, 1e-10, out=mel_spec)
+                    np.log10(mel_spec, out=mel_spec)
+                    mel_spec *= 10.0
+                    mel_spec -= ref_db
+                    np.maximum(mel_spec, mel_spec.max(initial=-80.0) - 80.0, out=mel_spec)
 
                     # Save as numpy array
                     output_path = output_dir / f"{wav_file.stem}.npy"
-                    np.save(output_path, mel_spec_db)
+                    np.save(output_path, mel_spec)
 
                 except Exception as e:
                     write_log(f"Error processing {wav_file}: {e}", "warning")
@@ -452,6 +469,11 @@ class ModelEnhancer(WorkerBase):
         # Process negative samples
         process_wav_dir(negative_dir, temp_dir / 'train' / 'negative')
 
+        # One memory-mapped shard per class instead of a .npy file per clip
+        from ml_training.data_prep import build_shard
+        consolidated = build_shard(str(temp_dir), 'train')
+        write_log(f"Consolidated {consolidated} spectrograms into window shards", "info")
+
         # Create empty val directories with at least one sample for validation
         # (The training code will handle 80/20 split if val is empty)
 
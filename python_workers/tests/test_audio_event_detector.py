@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from audio_event_detector import AudioEventDetector
+from common.audio_types import ModelConfig
+
+
+def test_postprocess_merges_windows_within_gap():
+    """Positive windows closer than merge_gap join into one segment."""
+    config = ModelConfig(
+        window_size_ms=1000, confidence_threshold=0.5,
+        merge_gap_ms=300, min_segment_duration_ms=500
+    )
+    predictions = [(0.0, 0.9), (0.25, 0.7), (1.5, 0.8), (5.0, 0.6), (6.0, 0.2)]
+
+    segments = AudioEventDetector()._postprocess_predictions(predictions, config)
+
+    assert [(s.start_seconds, s.end_seconds) for s in segments] == [(0.0, 2.5), (5.0, 6.0)]
+    assert abs(segments[0].confidence - 0.8) < 1e-9
+    assert abs(segments[1].confidence - 0.6) < 1e-9
+
+
+def test_postprocess_drops_short_segments_and_empty_input():
+    """Segments shorter than min_segment_duration_ms are filtered out."""
+    config = ModelConfig(
+        window_size_ms=1000, confidence_threshold=0.5,
+        merge_gap_ms=0, min_segment_duration_ms=1500
+    )
+    detector = AudioEventDetector()
+
+    assert detector._postprocess_predictions([(0.0, 0.9), (3.0, 0.9)], config) == []
+    assert detector._postprocess_predictions([], config) == []
+
+
+def test_find_active_windows_skips_silence_floor():
+    """Windows entirely at the -80 dB floor are skipped; any louder bin keeps them."""
+    mel_db = np.full((128, 100), -80.0, dtype=np.float32)
+    mel_db[5, 40] = -30.0
+    frame_peak_db = mel_db.max(axis=0)
+    starts = np.array([0, 9, 16, 32, 41, 68])
+
+    active = AudioEventDetector()._find_active_windows(frame_peak_db, starts, 32, -80.0)
+
+    assert active.tolist() == [1, 2, 3]
+    assert AudioEventDetector()._find_active_windows(frame_peak_db, starts, 32, -20.0).tolist() == []
+
+
+def test_cuda_options_are_plain_values():
+    """ORT stringifies provider options, so objects such as OrtArenaCfg must not appear."""
+    options = AudioEventDetector()._cuda_options()
+
+    assert options
+    assert all(isinstance(value, (str, int, float)) for value in options.values())
@@ -0,0 +1,88 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.json_io import write_progress
+from common.worker_base import WorkerBase, serve_pool
+
+
+class EchoWorker(WorkerBase):
+    def __init__(self):
+        super().__init__()
+        self.jobs = 0
+
+    def validate_input(self, input_data):
+        if 'value' not in input_data:
+            raise ValueError("Missing required field: value")
+
+    def process(self, input_data):
+        self.jobs += 1
+        return {'value': input_data['value'], 'jobs': self.jobs}
+
+
+def test_serve_processes_each_line_and_survives_bad_jobs(monkeypatch, capsys):
+    """One result or error per stdin line; worker state persists between jobs."""
+    stdin = '{"value": 1}\nnot json\n\n{"other": 2}\n{"value": 3}\n'
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(stdin))
+
+    assert EchoWorker().serve() == 0
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    outcomes = [m for m in messages if m['type'] in ('result', 'error')]
+    assert [m['type'] for m in outcomes] == ['result', 'error', 'error', 'result']
+    assert outcomes[0]['data'] == {'value': 1, 'jobs': 1}
+    assert outcomes[3]['data'] == {'value': 3, 'jobs': 2}
+
+
+def test_serve_pool_runs_every_job_with_unsplit_output(monkeypatch, capsys):
+    """Each job's lines come out together; bad jobs still get an error line."""
+    stdin = '{"value": 1}\n{"other": 2}\n{"value": 3}\n'
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(stdin))
+
+    assert serve_pool(EchoWorker, 2) == 0
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    outcomes = [m for m in messages if m['type'] in ('result', 'error')]
+    assert sorted(m['data']['value'] for m in outcomes if m['type'] == 'result') == [1, 3]
+    assert [m['type'] for m in outcomes].count('error') == 1
+    # A job's "completed" log line directly follows its result
+    for i, m in enumerate(messages):
+        if m['type'] == 'result':
+            assert messages[i + 1]['message'] == "Worker completed successfully"
+
+
+def test_run_guard_is_per_worker_and_override_skips_stdin(monkeypatch, capsys):
+    """A second worker in the process may still run; overrides never read stdin."""
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('{"value": 1}'))
+    first = EchoWorker()
+    assert first.run() == 0
+    assert first.run() == 1
+
+    second = EchoWorker()
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('{"value": 2}'))
+    assert second.run() == 0
+    assert second.run(input_override={'value': 3}) == 0
+    assert second.run(input_override={'other': 4}) == 1
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    results = [m['data'] for m in messages if m['type'] == 'result']
+    assert results == [{'value': 1, 'jobs': 1}, {'value': 2, 'jobs': 1}, {'value': 3, 'jobs': 2}]
+
+
+class ProgressWorker(EchoWorker):
+    def process(self, input_data):
+        write_progress(0, "Starting")
+        return super().process(input_data)
+
+
+def test_serve_writes_each_jobs_first_progress(monkeypatch, capsys):
+    """Progress dedup doesn't carry over: every job reports its first stage."""
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('{"value": 1}\n{"value": 2}\n'))
+
+    assert ProgressWorker().serve() == 0
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [m['stage'] for m in messages if m['type'] == 'progress'] == ["Starting", "Starting"]